@@ -0,0 +1,167 @@
+"""
+Disk-backed, content-addressed cache for backtest results.
+
+Each entry is stored under the SHA-256 of a JSON payload describing everything
+that determines the result (input file fingerprints plus every strategy
+parameter). Entries are pickled dicts, written atomically so concurrent pool
+workers can share one cache directory.
+
+The cache is size-bounded: after every write, least-recently-used entries
+(by file mtime, refreshed on each hit) are evicted until the total size fits.
+
+Usage:
+    cache = ResultCache('.backtest_cache', max_bytes=256 * 2**20)
+    key = cache.key({'data': fingerprints, 'params': params})
+    hit = cache.get(key)
+    if hit is None:
+        cache.put(key, {'returns': series, 'metrics': metrics})
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+from typing import Dict, Iterable, Optional
+
+ENTRY_SUFFIX = '.pkl'
+
+_FINGERPRINTS: Dict[tuple, str] = {}
+
+
+def file_fingerprint(path: str) -> Optional[str]:
+    """SHA-256 of a file's contents, memoized per (path, size, mtime)."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    memo_key = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+    if memo_key not in _FINGERPRINTS:
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                h.update(block)
+        _FINGERPRINTS[memo_key] = h.hexdigest()
+    return _FINGERPRINTS[memo_key]
+
+
+def fingerprint_files(paths: Iterable[str]) -> Dict[str, Optional[str]]:
+    """{basename: content hash} for each path (None if missing)."""
+    return {os.path.basename(p): file_fingerprint(p) for p in paths}
+
+
+class ResultCache:
+    """Content-addressed pickle store with LRU eviction.
+
+    Parameters
+    ----------
+    directory : str
+        Where entries live. Created lazily on first write.
+    max_bytes : int
+        Upper bound on the total size of all entries.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    # ── Keys ───────────────────────────────────
+
+    @staticmethod
+    def key(payload: dict) -> str:
+        """Stable hash of a JSON-serializable payload (numpy scalars allowed)."""
+        blob = json.dumps(payload, sort_keys=True, default=float, separators=(',', ':'))
+        return hashlib.sha256(blob.encode()).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ENTRY_SUFFIX)
+
+    # ── Read / write ───────────────────────────
+
+    def get(self, key: str) -> Optional[dict]:
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return value
+
+    def put(self, key: str, value: dict):
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self._path(key))
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        self.evict()
+
+    # ── Maintenance ────────────────────────────
+
+    def _entries(self):
+        """[(mtime, size, path)] for every entry, oldest first."""
+        if not os.path.isdir(self.directory):
+            return []
+        out = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(ENTRY_SUFFIX):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            out.append((st.st_mtime, st.st_size, path))
+        return sorted(out)
+
+    def evict(self) -> int:
+        """Drop least-recently-used entries until the cache fits. Returns count removed."""
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        return removed
+
+    def clear(self) -> int:
+        """Remove every entry. Returns count removed."""
+        removed = 0
+        for _, _, path in self._entries():
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+        return removed
+
+    def stats(self) -> dict:
+        entries = self._entries()
+        return {
+            'directory': self.directory,
+            'entries': len(entries),
+            'bytes': sum(size for _, size, _ in entries),
+            'max_bytes': self.max_bytes,
+            'oldest': entries[0][0] if entries else None,
+            'newest': entries[-1][0] if entries else None,
+        }
+
+    def __repr__(self) -> str:
+        s = self.stats()
+        return (f"ResultCache({self.directory}, {s['entries']} entries, "
+                f"{s['bytes'] / 2**20:.1f}/{self.max_bytes / 2**20:.1f} MB)")
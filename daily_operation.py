@@ -23,8 +23,8 @@ import matplotlib.ticker as mticker
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 from portfolio import Portfolio
 from strategy_all_8 import (
-    compute_weights, continuous_allocation, sigmoid,
-    ATH_PARAMS, ATH_GATE, SMA_PARAMS, ALL_ASSETS, EQUITY_ASSETS, INTL_ASSETS,
+    compute_weights, continuous_allocation, sigmoid, default_params,
+    ALL_ASSETS, EQUITY_ASSETS, INTL_ASSETS,
 )
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -253,7 +253,10 @@ def _get_data_safe():
         return None
 
 
-def compute_todays_target():
+def compute_todays_target(params=None):
+    """Target weights for today under a StrategyParams (default: strategy globals)."""
+    if params is None:
+        params = default_params()
     data = _get_data_safe()
     if data is None:
         return None
@@ -271,15 +274,14 @@ def compute_todays_target():
     yi = prev['yield_inv'] if pd.notna(prev.get('yield_inv')) else 0
     rf = prev['FEDFUNDS_real'] if pd.notna(prev.get('FEDFUNDS_real')) else 0
     ip = prev['INDPRO_growth'] if pd.notna(prev.get('INDPRO_growth')) else 0
-    rs, mod = continuous_allocation(cp, ce, ur, yi, rf, ip)
+    rs, mod = continuous_allocation(cp, ce, ur, yi, rf, ip, params=params)
 
     gate_val = 1.0
-    if ATH_GATE['enabled'] and pd.notna(prev.get('dCPI_YoY')):
-        gate_val = sigmoid(-prev['dCPI_YoY'] + ATH_GATE['thresh'], 0, ATH_GATE['k'])
+    if params.gate_enabled and pd.notna(prev.get('dCPI_YoY')):
+        gate_val = sigmoid(-prev['dCPI_YoY'] + params.gate_thresh, 0, params.gate_k)
 
     ath_factors = {}
-    for a in ALL_ASSETS:
-        param = ATH_PARAMS.get(a, 0)
+    for a, param in params.ath_params:
         factor = 1.0
         if param > 0 and prev.name in ath_series[a].index:
             ath_v = ath_series[a].loc[prev.name]
@@ -290,16 +292,16 @@ def compute_todays_target():
             factor = 1 + (factor - 1) * gate_val
         ath_factors[a] = factor
 
-    w = compute_weights(rs, mod, ce, ath_factors)
+    w = compute_weights(rs, mod, ce, ath_factors, params=params)
 
     for a in ALL_ASSETS:
         if a in prices:
             series = prices[a].dropna()
-            if len(series) > SMA_PARAMS['period']:
-                sma = series.rolling(SMA_PARAMS['period']).mean().iloc[-1]
+            if len(series) > params.sma_period:
+                sma = series.rolling(params.sma_period).mean().iloc[-1]
                 px = series.iloc[-1]
                 if pd.notna(sma) and sma > 0 and pd.notna(px):
-                    w[a] *= sigmoid(px / sma, 1.0, SMA_PARAMS['k'])
+                    w[a] *= sigmoid(px / sma, 1.0, params.sma_k)
 
     t2 = sum(w.values())
     if t2 > 0:
@@ -642,20 +644,33 @@ def generate_regime_explanation(raw_indicators, rs, m):
     return '\n'.join(lines)
 
 
-def generate_allocation_explanation(target, rs, m, cape_val, prices):
+def generate_allocation_explanation(target, rs, m, cape_val, prices, params=None):
     """Dynamically generate allocation equation explanation based on current rs/m values."""
-    total_equity = max(0, 0.65 - 0.38 * rs)
-    tlt_raw = 0.20 + 0.42 * rs
-    shy_raw = 0.05 + 0.12 * rs
-    gld_raw = 0.10 + 0.18 * m
-    dbc_raw = 0.00 + 0.12 * m
-
-    intl_factor = sigmoid(cape_val, 28, 3)
-    intl_share = 0.35 * intl_factor * max(0, 1 - rs) ** 3
+    if params is None:
+        params = default_params()
+    coefs = params.alloc_coefs
+    line = {s: c['base'] + c['rs'] * rs + c['m'] * m for s, c in coefs.items()}
+    total_equity = max(0, line['EQUITY'])
+    tlt_raw = line['TLT']
+    shy_raw = line['SHY']
+    gld_raw = line['GLD']
+    dbc_raw = line['DBC']
+
+    intl_factor = sigmoid(cape_val, params.intl_center, params.intl_k)
+    intl_share = params.intl_max_share * intl_factor * max(0, 1 - rs) ** params.intl_risk_power
     domestic_share = max(0, 1 - intl_share)
     spy_raw = total_equity * domestic_share
-    vxus_raw = total_equity * intl_share * 0.5
-    ewy_raw = total_equity * intl_share * 0.5
+    vxus_raw = total_equity * intl_share * (1 - params.ewy_share)
+    ewy_raw = total_equity * intl_share * params.ewy_share
+
+    def eq(sleeve):
+        """Allocation line as text, e.g. '0.20 + 0.42 × 0.512' (zero slopes omitted)."""
+        c = coefs[sleeve]
+        text = f"{c['base']:.2f}"
+        for key, x in (('rs', rs), ('m', m)):
+            if c[key] != 0:
+                text += f" {'−' if c[key] < 0 else '+'} {abs(c[key]):.2f} × {x:.3f}"
+        return text
 
     raw_pre_normalize = {
         'SPY': spy_raw, 'TLT': tlt_raw, 'GLD': gld_raw,
@@ -672,19 +687,20 @@ def generate_allocation_explanation(target, rs, m, cape_val, prices):
     lines.append('')
     lines.append('### Base Allocation (before ATH/SMA adjustments)')
     lines.append('')
-    lines.append(f'• total_equity = max(0, 0.65 − 0.38 × {rs:.3f}) = **{total_equity:.1%}**')
-    lines.append(f'• TLT = 0.20 + 0.42 × {rs:.3f} = **{tlt_raw:.1%}**')
-    lines.append(f'• SHY = 0.05 + 0.12 × {rs:.3f} = **{shy_raw:.1%}**')
-    lines.append(f'• GLD = 0.10 + 0.18 × {m:.3f} = **{gld_raw:.1%}**')
-    lines.append(f'• DBC = 0.00 + 0.12 × {m:.3f} = **{dbc_raw:.1%}**')
+    lines.append(f"• total_equity = max(0, {eq('EQUITY')}) = **{total_equity:.1%}**")
+    lines.append(f"• TLT = {eq('TLT')} = **{tlt_raw:.1%}**")
+    lines.append(f"• SHY = {eq('SHY')} = **{shy_raw:.1%}**")
+    lines.append(f"• GLD = {eq('GLD')} = **{gld_raw:.1%}**")
+    lines.append(f"• DBC = {eq('DBC')} = **{dbc_raw:.1%}**")
     lines.append('')
-    lines.append(f'• intl_factor = σ(CAPE={cape_val:.1f}, center=28, k=3) = **{intl_factor:.3f}**')
-    lines.append(f'• intl_share = 0.35 × {intl_factor:.3f} × max(0, 1 − {rs:.3f})³ = **{intl_share:.1%}**')
+    power = '³' if params.intl_risk_power == 3 else f'^{params.intl_risk_power:g}'
+    lines.append(f'• intl_factor = σ(CAPE={cape_val:.1f}, center={params.intl_center:g}, k={params.intl_k:g}) = **{intl_factor:.3f}**')
+    lines.append(f'• intl_share = {params.intl_max_share:g} × {intl_factor:.3f} × max(0, 1 − {rs:.3f}){power} = **{intl_share:.1%}**')
     lines.append(f'• domestic_share = 1 − {intl_share:.1%} = **{domestic_share:.1%}**')
     lines.append('')
     lines.append(f'• SPY = {total_equity:.1%} × {domestic_share:.1%} = **{spy_raw:.1%}**')
-    lines.append(f'• VXUS = {total_equity:.1%} × {intl_share:.1%} × 0.5 = **{vxus_raw:.1%}**')
-    lines.append(f'• EWY = {total_equity:.1%} × {intl_share:.1%} × 0.5 = **{ewy_raw:.1%}**')
+    lines.append(f'• VXUS = {total_equity:.1%} × {intl_share:.1%} × {1 - params.ewy_share:g} = **{vxus_raw:.1%}**')
+    lines.append(f'• EWY = {total_equity:.1%} × {intl_share:.1%} × {params.ewy_share:g} = **{ewy_raw:.1%}**')
     lines.append('')
     lines.append('### Normalized st8 Target')
     lines.append('')
@@ -0,0 +1,182 @@
+"""
+SQLite store for sweep and optimizer results.
+
+Every evaluated config is one row of the `results` table: the id of the run
+that produced it, its parameter columns and its per-window metrics. Parameter
+columns are indexed, so filters, sorts and per-group aggregates over millions
+of rows run inside SQLite without re-running any backtest. Columns are added
+on the fly the first time a run carries them (e.g. a sweep over a new
+parameter); rows from runs without that column read as NULL.
+
+Usage:
+    store = ResultStore('sweep_results.db')
+    run_id = store.write(df, source='sweep', param_cols=['intl_risk_power', 'ewy_share'])
+    best = store.query(where='dd60 > -0.20', group_by='ewy_share', metric='sh60')
+"""
+from __future__ import annotations
+
+import contextlib
+import datetime
+import os
+import re
+import sqlite3
+from typing import Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+_IDENT = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+AGGREGATES = ('max', 'min', 'avg')
+
+
+def _ident(name: str) -> str:
+    """Quoted SQL identifier for a column name; rejects anything but [A-Za-z0-9_]."""
+    if not _IDENT.match(name):
+        raise ValueError(f'invalid column name: {name!r}')
+    return f'"{name}"'
+
+
+class ResultStore:
+    """Append-only results table with one row per evaluated config.
+
+    Parameters
+    ----------
+    path : str
+        SQLite database file. Created lazily on first write.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    @contextlib.contextmanager
+    def _connect(self):
+        """Connection with the schema in place; commits on success, always closes."""
+        con = sqlite3.connect(self.path)
+        try:
+            con.execute('CREATE TABLE IF NOT EXISTS runs ('
+                        'run_id INTEGER PRIMARY KEY AUTOINCREMENT, source TEXT, created TEXT, '
+                        'rows INTEGER, params TEXT, note TEXT)')
+            con.execute('CREATE TABLE IF NOT EXISTS results (run_id INTEGER NOT NULL)')
+            con.execute('CREATE INDEX IF NOT EXISTS idx_results_run_id ON results(run_id)')
+            yield con
+            con.commit()
+        finally:
+            con.close()
+
+    def columns(self) -> List[str]:
+        if not os.path.exists(self.path):
+            return []
+        with self._connect() as con:
+            return [r[1] for r in con.execute('PRAGMA table_info(results)')]
+
+    def _ensure_columns(self, con: sqlite3.Connection, cols: Iterable[str], indexed: Iterable[str]):
+        have = {r[1] for r in con.execute('PRAGMA table_info(results)')}
+        for c in cols:
+            if c not in have:
+                con.execute(f'ALTER TABLE results ADD COLUMN {_ident(c)} REAL')
+        for c in indexed:
+            con.execute(f'CREATE INDEX IF NOT EXISTS {_ident("idx_results_" + c)} ON results({_ident(c)})')
+
+    # ── Write ──────────────────────────────────
+
+    def write(self, df: pd.DataFrame, source: str, param_cols: Iterable[str], note: str = '') -> int:
+        """Append every row of df as a new run. Returns the run id."""
+        param_cols = list(param_cols)
+        cols = list(df.columns)
+        values = df.to_numpy(dtype=float)
+        if np.isnan(values).any():
+            rows = [tuple(None if v != v else v for v in row) for row in values.tolist()]
+        else:
+            rows = map(tuple, values.tolist())
+        with self._connect() as con:
+            # Results are reproducible: trade OS-crash durability for insert speed
+            con.execute('PRAGMA synchronous = OFF')
+            self._ensure_columns(con, cols, param_cols)
+            cur = con.execute('INSERT INTO runs (source, created, rows, params, note) VALUES (?, ?, ?, ?, ?)',
+                              (source, datetime.datetime.now().isoformat(timespec='seconds'),
+                               len(df), ','.join(param_cols), note))
+            run_id = cur.lastrowid
+            names = ', '.join(['run_id'] + [_ident(c) for c in cols])
+            marks = ', '.join(['?'] * (len(cols) + 1))
+            con.executemany(f'INSERT INTO results ({names}) VALUES ({marks})',
+                            ((run_id,) + r for r in rows))
+        return run_id
+
+    # ── Read ───────────────────────────────────
+
+    def runs(self) -> pd.DataFrame:
+        if not os.path.exists(self.path):
+            return pd.DataFrame(columns=['run_id', 'source', 'created', 'rows', 'params', 'note'])
+        with self._connect() as con:
+            return pd.read_sql_query('SELECT * FROM runs ORDER BY run_id', con)
+
+    def query(self, where: Optional[str] = None, sort: Optional[str] = None, ascending: bool = False,
+              limit: Optional[int] = None, group_by: Optional[str] = None, metric: Optional[str] = None,
+              agg: str = 'max', run='latest', source: Optional[str] = None) -> pd.DataFrame:
+        """Filter, sort and aggregate stored results.
+
+        where is an SQL boolean expression over result columns (e.g.
+        "dd60 > -0.20 AND ewy_share >= 0.5"). run is 'latest' (the newest run
+        matching source), 'all', or a run id. With group_by (comma-separated
+        columns) and agg 'max'/'min', each group returns the full row holding
+        the best metric; with agg 'avg' it returns count, mean, min and max of
+        metric per group. Without group_by, rows are ordered by sort (default:
+        metric) and cut to limit.
+        """
+        if not os.path.exists(self.path):
+            return pd.DataFrame()
+        agg = agg.lower()
+        if agg not in AGGREGATES:
+            raise ValueError(f'agg must be one of {AGGREGATES}')
+        conds, args = [], []
+        with self._connect() as con:
+            if source is not None:
+                conds.append('run_id IN (SELECT run_id FROM runs WHERE source = ?)')
+                args.append(source)
+            if run == 'latest':
+                sql = 'SELECT MAX(run_id) FROM runs' + (' WHERE source = ?' if source is not None else '')
+                latest = con.execute(sql, [source] if source is not None else []).fetchone()[0]
+                if latest is None:
+                    return pd.DataFrame()
+                conds.append('run_id = ?')
+                args.append(latest)
+            elif run != 'all':
+                conds.append('run_id = ?')
+                args.append(int(run))
+            if where:
+                conds.append(f'({where})')
+            clause = (' WHERE ' + ' AND '.join(conds)) if conds else ''
+
+            if group_by:
+                if metric is None:
+                    raise ValueError('group_by needs a metric')
+                keys = ', '.join(_ident(c.strip()) for c in group_by.split(','))
+                m = _ident(metric)
+                if agg == 'avg':
+                    sql = (f'SELECT {keys}, COUNT(*) AS n, AVG({m}) AS avg_{metric}, '
+                           f'MIN({m}) AS min_{metric}, MAX({m}) AS max_{metric} '
+                           f'FROM results{clause} GROUP BY {keys} ORDER BY {keys}')
+                else:
+                    # SQLite returns the other columns from the row that holds MAX()/MIN()
+                    sql = (f'SELECT *, COUNT(*) AS n, {agg.upper()}({m}) AS {agg}_{metric} '
+                           f'FROM results{clause} GROUP BY {keys} ORDER BY {keys}')
+            else:
+                order = sort or metric
+                sql = f'SELECT * FROM results{clause}'
+                if order:
+                    sql += f' ORDER BY {_ident(order)} {"ASC" if ascending else "DESC"}'
+                if limit:
+                    sql += f' LIMIT {int(limit)}'
+            return pd.read_sql_query(sql, con, params=args)
+
+    def stats(self) -> dict:
+        if not os.path.exists(self.path):
+            return {'path': self.path, 'runs': 0, 'rows': 0, 'bytes': 0}
+        with self._connect() as con:
+            n_runs = con.execute('SELECT COUNT(*) FROM runs').fetchone()[0]
+            n_rows = con.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+        return {'path': self.path, 'runs': n_runs, 'rows': n_rows, 'bytes': os.path.getsize(self.path)}
+
+    def __repr__(self) -> str:
+        s = self.stats()
+        return f"ResultStore({self.path}, {s['runs']} runs, {s['rows']:,} rows)"
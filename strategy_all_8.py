@@ -11,17 +11,50 @@ This prevents allocating to high-beta international equities during risk-off per
 while preserving the CAPE-based valuation rotation during risk-on periods.
 
 Usage:
-    python3 strategy_all_8.py history      # backtest
+    python3 strategy_all_8.py history      # backtest + rolling 12/36/60m metrics plot
     python3 strategy_all_8.py current      # current allocation
-    python3 strategy_all_8.py optimize     # grid search params
+    python3 strategy_all_8.py optimize     # grid search params [--workers N] [--checkpoint F] [--prune] [--prune-cap S] [--hard-dd]
+    python3 strategy_all_8.py sweep        # batched dense grid search [--checkpoint F]
+    python3 strategy_all_8.py smasweep     # SMA period × k sweep
+    python3 strategy_all_8.py athsweep     # ATH multipliers × gate k sweep
+    python3 strategy_all_8.py allocsweep   # allocation-line matrix re-fit [--configs N] [--seed S] [--checkpoint F]
+    python3 strategy_all_8.py sensitivity  # INDICATORS c/k/w perturbation table
+    python3 strategy_all_8.py lagsweep     # FRED publication lag 0-90 days per series
+    python3 strategy_all_8.py ablation     # every INDICATORS subset × yield-inversion switch
+    python3 strategy_all_8.py pareto       # Sharpe/CAGR/drawdown frontier [--checkpoint F]
+    python3 strategy_all_8.py results      # query stored sweeps [--where E] [--group-by C --metric M] [--runs]
+    python3 strategy_all_8.py search       # adaptive search [--budget N] [--seed S]
+    python3 strategy_all_8.py walkforward  # rolling re-optimization [--train Y] [--test Y] [--workers N]
+    python3 strategy_all_8.py montecarlo   # block bootstrap [--paths N] [--block M] [--seed S]
+    python3 strategy_all_8.py daily        # daily replay under the live budget [--budget N] [--cash N] [--start D]
+    python3 strategy_all_8.py rebalance    # weekly/monthly/quarterly/drift calendars in one run [--start D]
+    python3 strategy_all_8.py verify       # loop vs vectorized engine
+    python3 strategy_all_8.py cache [info|clear]  # on-disk result cache
 """
 import pandas as pd
 import numpy as np
-import os, sys, itertools
-from typing import Dict, Optional
+import csv, io, multiprocessing, os, re, sys, tempfile, time, itertools
+import dataclasses
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from backtest_cache import ResultCache, fingerprint_files
+from results_store import ResultStore
 
 DATA_DIR = os.environ.get('DATA_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data_cache'))
+PLOTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'plots')
+RESULT_CACHE_DIR = os.environ.get('BACKTEST_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.backtest_cache'))
+RESULT_CACHE_MAX_MB = float(os.environ.get('BACKTEST_CACHE_MAX_MB', 256))
+# Bump when engine semantics change so stale cached results are not reused
+RESULT_CACHE_VERSION = 2
+RESULTS_DB = os.environ.get('BACKTEST_RESULTS_DB', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sweep_results.db'))
 ALL_ASSETS = ['SPY', 'TLT', 'GLD', 'SHY', 'DBC', 'VXUS', 'EWY']
+FRED_FILES = [('CPI', 'FRED_CPIAUCSL.csv'), ('UNRATE', 'FRED_UNRATE.csv'),
+              ('T10Y2Y', 'FRED_T10Y2Y.csv'), ('FEDFUNDS', 'FRED_FEDFUNDS.csv'),
+              ('INDPRO', 'FRED_INDPRO.csv')]
+# Assumed publication delay: a FRED observation dated d is first usable on d + FRED_LAG_DAYS
+FRED_LAG_DAYS = 45
 INTL_ASSETS = ['VXUS', 'EWY']
 EQUITY_ASSETS = ['SPY', 'VXUS', 'EWY']
 
@@ -39,6 +72,18 @@ ATH_PARAMS = {
     'VXUS': 0, 'EWY': 0,
 }
 
+# Allocation lines: raw sleeve weight = base + slope @ [rs, m], i.e.
+# base + rs * coef['rs'] + m * coef['m']. EQUITY (floored at 0) is split into
+# SPY / VXUS / EWY by the international rotation; raw weights are then normalized.
+ALLOC_COEFS = {
+    'EQUITY': {'base': 0.65, 'rs': -0.38, 'm': 0.00},
+    'TLT':    {'base': 0.20, 'rs': 0.42,  'm': 0.00},
+    'SHY':    {'base': 0.05, 'rs': 0.12,  'm': 0.00},
+    'GLD':    {'base': 0.10, 'rs': 0.00,  'm': 0.18},
+    'DBC':    {'base': 0.00, 'rs': 0.00,  'm': 0.12},
+}
+ALLOC_SLEEVES = list(ALLOC_COEFS)
+
 ATH_GATE = {'enabled': True, 'metric': 'dCPI_YoY', 'thresh': 0.0, 'k': 30}
 SMA_PARAMS = {'period': 220, 'k': 70}
 
@@ -55,14 +100,139 @@ INTL_RISK_POWER = 3.0
 # 0.5 = balanced split, 1.0 = all to EWY
 EWY_SHARE = 0.5
 
+# Optimizer windows (start_year, end_year) and drawdown limits that halve the score
+OPT_WINDOWS = ((2011, 2024), (2000, 2024), (1965, 2024))
+OPT_DD_LIMITS = {(2011, 2024): -0.20, (2000, 2024): -0.25, (1965, 2024): -0.25}
+
+# One-way trading cost per asset in basis points of the value traded (half spread + slippage)
+COST_BPS = {'SPY': 1, 'TLT': 2, 'GLD': 2, 'SHY': 1, 'DBC': 5, 'VXUS': 3, 'EWY': 5}
+
 
 def sigmoid(x, c=1.0, k=10.0):
-    return 1 / (1 + np.exp(-k * (x - c)))
+    """Logistic curve, stable for steep k: exp() only ever sees non-positive arguments."""
+    z = k * (np.asarray(x, dtype=float) - c)
+    e = np.exp(-np.abs(z))
+    out = np.where(z >= 0, 1 / (1 + e), e / (1 + e))
+    return out if out.ndim else float(out)
+
+
+# ── Parameter set ─────────────────────────────────────────
+
+@dataclass(frozen=True)
+class StrategyParams:
+    """Immutable, hashable set of every strategy parameter.
+
+    Mapping-valued parameters are stored as tuples of pairs so an instance can
+    be a dict key, cross process boundaries and feed the result-cache key;
+    indicator(), ath, gate and sma give the familiar dict views.
+    default_params() builds one from the module globals; derive variants with
+    .replace(), which also accepts dicts for the mapping-valued fields.
+    """
+    indicators: Tuple[Tuple[str, float, float, float], ...]   # (name, c, k, w)
+    ath_params: Tuple[Tuple[str, float], ...]                 # (asset, multiplier), ALL_ASSETS order
+    gate_enabled: bool
+    gate_metric: str
+    gate_thresh: float
+    gate_k: float
+    sma_period: int
+    sma_k: float
+    intl_center: float
+    intl_k: float
+    intl_max_share: float
+    intl_risk_power: float
+    ewy_share: float
+    alloc: Tuple[Tuple[str, float, float, float], ...]        # (sleeve, base, rs slope, m slope)
+
+    @staticmethod
+    def _fields_from(indicators=None, ath_params=None, gate=None, sma_params=None, alloc=None):
+        """Field values for whichever dict-style groups are given."""
+        out = {}
+        if indicators is not None:
+            out['indicators'] = tuple((n, float(v['c']), float(v['k']), float(v['w']))
+                                      for n, v in indicators.items())
+        if ath_params is not None:
+            out['ath_params'] = tuple((a, float(ath_params.get(a, 0))) for a in ALL_ASSETS)
+        if gate is not None:
+            out.update(gate_enabled=bool(gate['enabled']), gate_metric=gate.get('metric', 'dCPI_YoY'),
+                       gate_thresh=float(gate['thresh']), gate_k=float(gate['k']))
+        if sma_params is not None:
+            out.update(sma_period=int(sma_params['period']), sma_k=float(sma_params['k']))
+        if alloc is not None:
+            out['alloc'] = tuple((s, float(alloc[s]['base']), float(alloc[s]['rs']), float(alloc[s]['m']))
+                                 for s in ALLOC_SLEEVES)
+        return out
+
+    def replace(self, indicators=None, ath_params=None, gate=None, sma_params=None, alloc=None, **changes):
+        """Copy with changes; indicators, ath_params, gate, sma_params and alloc may be dicts."""
+        fields = self._fields_from(indicators if isinstance(indicators, dict) else None,
+                                   ath_params if isinstance(ath_params, dict) else None,
+                                   gate, sma_params,
+                                   alloc if isinstance(alloc, dict) else None)
+        if indicators is not None and not isinstance(indicators, dict):
+            fields['indicators'] = tuple(indicators)
+        if ath_params is not None and not isinstance(ath_params, dict):
+            fields['ath_params'] = tuple(ath_params)
+        if alloc is not None and not isinstance(alloc, dict):
+            fields['alloc'] = tuple(alloc)
+        fields.update(changes)
+        return dataclasses.replace(self, **fields)
+
+    def indicator(self, name):
+        for n, c, k, w in self.indicators:
+            if n == name:
+                return {'c': c, 'k': k, 'w': w}
+        raise KeyError(name)
+
+    @property
+    def ath(self):
+        return dict(self.ath_params)
+
+    @property
+    def gate(self):
+        return {'enabled': self.gate_enabled, 'metric': self.gate_metric,
+                'thresh': self.gate_thresh, 'k': self.gate_k}
+
+    @property
+    def sma(self):
+        return {'period': self.sma_period, 'k': self.sma_k}
+
+    @property
+    def alloc_coefs(self):
+        return {s: {'base': b, 'rs': r, 'm': m} for s, b, r, m in self.alloc}
+
+    def alloc_matrix(self):
+        """(sleeves, 3) array of [base, rs slope, m slope] rows in ALLOC_SLEEVES order."""
+        coefs = self.alloc_coefs
+        return np.array([[coefs[s]['base'], coefs[s]['rs'], coefs[s]['m']] for s in ALLOC_SLEEVES])
+
+    def to_dict(self):
+        """JSON-serializable form, used for cache keys."""
+        return dataclasses.asdict(self)
+
+
+def default_params():
+    """StrategyParams from the current module-level parameter globals."""
+    return StrategyParams(
+        intl_center=float(INTL_ROTATION['center']), intl_k=float(INTL_ROTATION['k']),
+        intl_max_share=float(INTL_ROTATION['max_share']),
+        intl_risk_power=float(INTL_RISK_POWER), ewy_share=float(EWY_SHARE),
+        **StrategyParams._fields_from(INDICATORS, ATH_PARAMS, ATH_GATE, SMA_PARAMS, ALLOC_COEFS))
+
+
+def _resolve_params(params=None, ath_params=None, gate=None, sma_params=None,
+                    intl_risk_power=None, ewy_share=None, intl_max_share=None):
+    """params (default: module globals) with any legacy keyword overrides applied."""
+    p = params if params is not None else default_params()
+    changes = {k: v for k, v in (('intl_risk_power', intl_risk_power), ('ewy_share', ewy_share),
+                                 ('intl_max_share', intl_max_share)) if v is not None}
+    if ath_params is None and gate is None and sma_params is None and not changes:
+        return p
+    return p.replace(ath_params=ath_params, gate=gate, sma_params=sma_params, **changes)
 
 
 # ── Data loading ──────────────────────────────────────────
 
-def load_fred(name, filename, shift_days=45):
+def load_fred(name, filename, shift_days=FRED_LAG_DAYS):
     p = f'{DATA_DIR}/{filename}'
     if not os.path.exists(p):
         return None
@@ -94,74 +264,127 @@ def load_cape():
 
 # ── Core strategy ─────────────────────────────────────────
 
-def continuous_allocation(cpi_yoy, cape, unrate, yield_inv, fedfunds_real, indpro_growth):
-    rc = sigmoid(cpi_yoy, INDICATORS['CPI']['c'], INDICATORS['CPI']['k']) * INDICATORS['CPI']['w']
-    rca = sigmoid(cape, INDICATORS['CAPE']['c'], INDICATORS['CAPE']['k']) * INDICATORS['CAPE']['w']
-    ru = sigmoid(unrate, INDICATORS['UNRATE']['c'], INDICATORS['UNRATE']['k']) * yield_inv * INDICATORS['UNRATE']['w']
-    rff = sigmoid(fedfunds_real, INDICATORS['FEDFUNDS_real']['c'], INDICATORS['FEDFUNDS_real']['k']) * INDICATORS['FEDFUNDS_real']['w'] if pd.notna(fedfunds_real) else 0
-    rind = sigmoid(indpro_growth, INDICATORS['INDPRO']['c'], INDICATORS['INDPRO']['k']) * INDICATORS['INDPRO']['w'] if pd.notna(indpro_growth) else 0
-
-    tw = sum(v['w'] for v in INDICATORS.values())
-    rs = max(0, min(1, (rc + rca + ru + rff + rind) / tw))
-    m = 1 - (2 * rs - 1) ** 2
-    return rs, m
+def continuous_allocation(cpi_yoy, cape, unrate, yield_inv, fedfunds_real, indpro_growth,
+                          params=None):
+    rs, m = continuous_allocation_array(cpi_yoy, cape, unrate, yield_inv, fedfunds_real, indpro_growth,
+                                        params=params)
+    return float(rs), float(m)
 
 
 def compute_weights(rs, m, cape_val, ath_factors=None,
                     intl_risk_power=None, ewy_share=None,
-                    intl_max_share=None):
+                    intl_max_share=None, params=None):
     """Compute weights with risk-gated international rotation."""
+    ath = None
+    if ath_factors:
+        ath = np.array([ath_factors.get(a, 0.0) for a in ALL_ASSETS], dtype=float)
+    w = compute_weights_array(rs, m, cape_val, ath,
+                              intl_risk_power=intl_risk_power,
+                              ewy_share=ewy_share,
+                              intl_max_share=intl_max_share,
+                              params=params)
+    return {a: float(v) for a, v in zip(ALL_ASSETS, w)}
+
+
+def continuous_allocation_array(cpi_yoy, cape, unrate, yield_inv, fedfunds_real, indpro_growth,
+                                params=None, indicators=None):
+    """Risk score and modulation for scalars or arrays of macro inputs.
+
+    Missing (NaN) real fed funds or INDPRO growth contribute no risk, as in
+    the live target. Indicator curves come from params (default: module
+    globals), or from indicators, an INDICATORS-shaped dict whose c/k/w values
+    may be arrays that broadcast against the inputs (e.g. (C, 1) against
+    (months,) to score C indicator sets at once). Returns (rs, m) with the
+    broadcast shape of the inputs and indicator values.
+    """
+    if indicators is None:
+        p = params if params is not None else default_params()
+        indicators = {n: {'c': c, 'k': k, 'w': w} for n, c, k, w in p.indicators}
+    fedfunds_real = np.asarray(fedfunds_real, dtype=float)
+    indpro_growth = np.asarray(indpro_growth, dtype=float)
+
+    def risk(x, name):
+        i = indicators[name]
+        return sigmoid(x, i['c'], i['k']) * i['w']
+
+    rc = risk(cpi_yoy, 'CPI')
+    rca = risk(cape, 'CAPE')
+    ru = risk(unrate, 'UNRATE') * yield_inv
+    rff = np.where(np.isnan(fedfunds_real), 0.0, risk(fedfunds_real, 'FEDFUNDS_real'))
+    rind = np.where(np.isnan(indpro_growth), 0.0, risk(indpro_growth, 'INDPRO'))
+
+    tw = sum(v['w'] for v in indicators.values())
+    rs = np.clip((rc + rca + ru + rff + rind) / tw, 0, 1)
+    m = 1 - (2 * rs - 1) ** 2
+    return rs, m
+
+
+def compute_weights_array(rs, m, cape_val, ath_factors=None,
+                          intl_risk_power=None, ewy_share=None,
+                          intl_max_share=None, params=None, alloc=None):
+    """Weights for scalars or arrays of rs, m and CAPE.
+
+    rs, m, cape_val and the three rotation parameters broadcast against each
+    other; rotation parameters left as None come from params (default: module
+    globals). alloc is the allocation-line matrix, (sleeves, 3) as from
+    StrategyParams.alloc_matrix() or (..., sleeves, 3) to give each config its
+    own (default: from params). ath_factors, if given, has shape
+    (..., len(ALL_ASSETS)) and only factors > 0 are applied. Returns weights of shape broadcast(...) +
+    (len(ALL_ASSETS),), e.g. (n, assets) for n months, columns in ALL_ASSETS order.
+    """
+    p = params if params is not None else default_params()
     if intl_risk_power is None:
-        intl_risk_power = INTL_RISK_POWER
+        intl_risk_power = p.intl_risk_power
     if ewy_share is None:
-        ewy_share = EWY_SHARE
+        ewy_share = p.ewy_share
     if intl_max_share is None:
-        intl_max_share = INTL_ROTATION['max_share']
+        intl_max_share = p.intl_max_share
+
+    rs, m, cape_val, intl_risk_power, ewy_share, intl_max_share = np.broadcast_arrays(
+        rs, m, cape_val, intl_risk_power, ewy_share, intl_max_share)
 
-    total_equity = max(0, 0.65 - 0.38 * rs)
+    # Allocation lines for every sleeve at once: base + slope @ [rs, m]
+    coef = p.alloc_matrix() if alloc is None else np.asarray(alloc, dtype=float)
+    lines = coef[..., 0] + (coef[..., 1:] @ np.stack([rs, m], axis=-1)[..., None])[..., 0]
+    sleeve = {s: lines[..., j] for j, s in enumerate(ALLOC_SLEEVES)}
+    total_equity = np.maximum(0, sleeve['EQUITY'])
 
     # CAPE-based international split
-    intl_factor = sigmoid(cape_val, INTL_ROTATION['center'], INTL_ROTATION['k'])
+    intl_factor = sigmoid(cape_val, p.intl_center, p.intl_k)
     intl_share = intl_max_share * intl_factor
 
     # st8 RISK GATE: aggressively cut international when macro is risky
-    intl_share *= max(0, 1 - rs) ** intl_risk_power
+    intl_share = intl_share * np.maximum(0, 1 - rs) ** intl_risk_power
 
-    domestic_share = max(0, 1 - intl_share)
+    domestic_share = np.maximum(0, 1 - intl_share)
 
     raw = {
         'SPY': total_equity * domestic_share,
-        'TLT': 0.20 + 0.42 * rs,
-        'SHY': 0.05 + 0.12 * rs,
-        'GLD': 0.10 + 0.18 * m,
-        'DBC': 0.00 + 0.12 * m,
+        'TLT': sleeve['TLT'],
+        'SHY': sleeve['SHY'],
+        'GLD': sleeve['GLD'],
+        'DBC': sleeve['DBC'],
         'VXUS': total_equity * intl_share * (1 - ewy_share),
         'EWY': total_equity * intl_share * ewy_share,
     }
-    tot = sum(raw.values())
-    w = {k: max(0, v / tot) for k, v in raw.items()}
-
-    if ath_factors:
-        for a, factor in ath_factors.items():
-            if factor > 0 and a in w:
-                w[a] = max(0, w[a] * factor)
+    w = np.stack([raw[a] for a in ALL_ASSETS], axis=-1)
+    w = np.maximum(0, w / w.sum(axis=-1, keepdims=True))
 
-    t2 = sum(w[a] for a in ALL_ASSETS)
-    if t2 > 0:
-        for a in ALL_ASSETS:
-            w[a] /= t2
+    if ath_factors is not None:
+        ath_factors = np.asarray(ath_factors, dtype=float)
+        w = np.where(ath_factors > 0, np.maximum(0, w * ath_factors), w)
 
-    return w
+    t2 = w.sum(axis=-1, keepdims=True)
+    return np.divide(w, t2, out=w.copy(), where=t2 > 0)
 
 
 # ── Backtest ──────────────────────────────────────────────
 
 def _build_data():
+    # Raw observation dates; publication lags are applied per series by fred_macro()
     fred = {}
-    for n, fn in [('CPI', 'FRED_CPIAUCSL.csv'), ('UNRATE', 'FRED_UNRATE.csv'),
-                  ('T10Y2Y', 'FRED_T10Y2Y.csv'), ('FEDFUNDS', 'FRED_FEDFUNDS.csv'),
-                  ('INDPRO', 'FRED_INDPRO.csv')]:
-        fred[n] = load_fred(n, fn)
+    for n, fn in FRED_FILES:
+        fred[n] = load_fred(n, fn, shift_days=0)
     if any(v is None for v in fred.values()):
         return None
 
@@ -181,21 +404,23 @@ def _build_data():
         m[a] = prices[a].resample('ME').last()
     for a in ALL_ASSETS:
         m[f'{a}_r'] = m[a].pct_change()
-    for n, s in fred.items():
-        m[n] = s.reindex(m.index, method='ffill')
-    m['CPI_YoY'] = m['CPI'].pct_change(12) * 100
-    m['yield_inv'] = (m['T10Y2Y'] < 0).astype(int)
+    for col, v in fred_macro(fred, m.index).items():
+        m[col] = v
+    m['yield_inv'] = m['yield_inv'].astype(int)
     m['CAPE'] = cape.reindex(m.index, method='ffill')
-    m['FEDFUNDS_real'] = m['FEDFUNDS'] - m['CPI_YoY']
-    m['INDPRO_growth'] = m['INDPRO'].pct_change(12) * 100
-    m['dCPI_YoY'] = m['CPI_YoY'].diff()
 
     ath_series = {a: prices[a].expanding().max() for a in ALL_ASSETS}
     monthly_prices = {a: prices[a].resample('ME').last() for a in ALL_ASSETS}
     sma_cache = {}
 
-    return {'m': m, 'prices': prices, 'monthly_prices': monthly_prices,
-            'ath_series': ath_series, 'sma_cache': sma_cache}
+    data = {'m': m, 'fred': fred, 'prices': prices, 'monthly_prices': monthly_prices,
+            'ath_series': ath_series, 'sma_cache': sma_cache,
+            'sma_ratio_cache': {}}
+    data['signals'] = _build_signals(data)
+    # Drawdown-from-peak ratios as a plain (months × assets) array for batch kernels
+    data['ath_dd'] = data['signals'][[f'{a}_ath_dd' for a in ALL_ASSETS]].to_numpy(dtype=float)
+    _get_sma_ratio(data, SMA_PARAMS['period'])
+    return data
 
 
 _DATA_CACHE = None
@@ -217,23 +442,184 @@ def _get_sma_series(data, period):
     return sma_cache[period]
 
 
+def _unique_index(s):
+    """Drop repeated dates (CI appends can repeat the last row), keeping the latest."""
+    return s[~s.index.duplicated(keep='last')]
+
+
+# Lag-dependent signal columns: source column of data['m'] and backtest default when missing
+MACRO_SIGNALS = {'cpi_yoy': ('CPI_YoY', 2), 'unrate': ('UNRATE', 5), 'yield_inv': ('yield_inv', 0),
+                 'fedfunds_real': ('FEDFUNDS_real', 0), 'indpro_growth': ('INDPRO_growth', 0),
+                 'dcpi_yoy': ('dCPI_YoY', None)}
+
+
+def fred_asof(s, dates, lag_days=FRED_LAG_DAYS):
+    """Values of a raw FRED series as seen on each of dates under a publication lag.
+
+    An observation dated d is usable from d + lag_days on, so each date sees
+    the last observation dated on or before date - lag_days (NaN before the
+    first). lag_days is a scalar or a (C,) array; returns (len(dates),) or
+    (C, len(dates)).
+    """
+    lag = np.rint(np.asarray(lag_days, dtype=float)).astype('int64')
+    cut = np.asarray(dates, dtype='datetime64[ns]') - lag[..., None].astype('timedelta64[D]')
+    pos = np.searchsorted(s.index.to_numpy().astype('datetime64[ns]'), cut, side='right') - 1
+    return np.where(pos >= 0, s.to_numpy(dtype=float)[np.maximum(pos, 0)], np.nan)
+
+
+def _pct_change_12(x):
+    """Year-over-year % change along the last (monthly) axis, NaN for the first 12 months."""
+    out = np.full(x.shape, np.nan)
+    out[..., 12:] = (x[..., 12:] / x[..., :-12] - 1) * 100
+    return out
+
+
+def fred_macro(fred, dates, lags=None):
+    """Month-end macro columns of data['m'] from unshifted FRED series.
+
+    fred maps FRED_FILES names to raw series and lags maps the same names to a
+    publication lag in days, scalar or (C,) array (FRED_LAG_DAYS for series
+    not given). Returns the lagged levels plus CPI_YoY, yield_inv,
+    FEDFUNDS_real, INDPRO_growth and dCPI_YoY as arrays of shape (len(dates),)
+    or (C, len(dates)).
+    """
+    lags = lags or {}
+    out = {n: fred_asof(s, dates, lags.get(n, FRED_LAG_DAYS)) for n, s in fred.items()}
+    out['CPI_YoY'] = _pct_change_12(out['CPI'])
+    out['yield_inv'] = (out['T10Y2Y'] < 0).astype(float)
+    out['FEDFUNDS_real'] = out['FEDFUNDS'] - out['CPI_YoY']
+    out['INDPRO_growth'] = _pct_change_12(out['INDPRO'])
+    out['dCPI_YoY'] = np.full(out['CPI_YoY'].shape, np.nan)
+    out['dCPI_YoY'][..., 1:] = np.diff(out['CPI_YoY'], axis=-1)
+    return out
+
+
+def macro_signals(data, lags=None):
+    """MACRO_SIGNALS columns of data['signals'] under per-series publication lags.
+
+    Derived from the raw FRED series kept in data, without re-reading any
+    file; lags as for fred_macro(). Default lags reproduce data['signals'].
+    Returns a dict of (months,) or (C, months) arrays.
+    """
+    raw = fred_macro(data['fred'], data['m'].index, lags)
+    return {col: raw[src] if fill is None else np.where(np.isnan(raw[src]), fill, raw[src])
+            for col, (src, fill) in MACRO_SIGNALS.items()}
+
+
+def _build_signals(data):
+    """Per-month strategy inputs that do not depend on any tunable parameter.
+
+    Indexed like data['m']; row i holds what the rebalance at the end of month i sees:
+    macro inputs with backtest defaults filled in, the raw inflation-gate input,
+    ATH drawdown ratios (ath / price - 1, 0 when at a high or not a trading day)
+    and month-end prices lagged by one month.
+    """
+    m = data['m']
+    sig = pd.DataFrame(index=m.index)
+    sig['cape'] = m['CAPE'].fillna(25)
+    for col, (src, fill) in MACRO_SIGNALS.items():
+        sig[col] = m[src] if fill is None else m[src].fillna(fill)
+    for a in ALL_ASSETS:
+        ath_v = _unique_index(data['ath_series'][a]).reindex(m.index)
+        pr = _unique_index(data['prices'][a]).reindex(m.index)
+        sig[f'{a}_ath_dd'] = ((ath_v - pr) / pr).where((pr > 0) & (ath_v > pr), 0.0)
+    for a in ALL_ASSETS:
+        sig[f'{a}_px_lag'] = data['monthly_prices'][a].shift(1).reindex(m.index)
+    return sig
+
+
+def _daily_price_sums(data):
+    """Per-asset daily cumulative sums and month-end positions, built once.
+
+    For each asset: (cs, nan_cs, pos) where cs is the cumulative sum of daily
+    closes (NaN as 0) with a leading 0, nan_cs the running count of NaN closes,
+    and pos the position of the last daily close in each month of data['m']
+    (-1 if the asset has no data that month). A rolling mean of any period at
+    a month end is then (cs[pos + 1] - cs[pos + 1 - period]) / period.
+    """
+    if 'price_sums' not in data:
+        idx = data['m'].index
+        month_start = (idx - pd.offsets.MonthBegin(1)).to_numpy()
+        next_start = (idx + pd.Timedelta(days=1)).to_numpy()
+        sums = {}
+        for a in ALL_ASSETS:
+            p = data['prices'][a]
+            v = p.to_numpy(dtype=float)
+            cs = np.concatenate([[0.0], np.cumsum(np.nan_to_num(v))])
+            nan_cs = np.concatenate([[0], np.cumsum(np.isnan(v))])
+            dates = p.index.to_numpy()
+            pos = np.searchsorted(dates, next_start, side='left') - 1
+            has = (pos >= 0) & (dates[np.maximum(pos, 0)] >= month_start)
+            sums[a] = (cs, nan_cs, np.where(has, pos, -1))
+        data['price_sums'] = sums
+    return data['price_sums']
+
+
+def sma_ratio_matrix(data, periods):
+    """Lagged month-end price / SMA ratios for a vector of SMA periods in one shot.
+
+    Returns a (len(periods), months, assets) array indexed like data['m'] on the
+    month axis; NaN where the SMA filter does not apply. Equivalent to the
+    pandas rolling-mean path in _get_sma_series(), but every period is an O(1)
+    difference of the cached cumulative sums.
+    """
+    periods = np.atleast_1d(np.asarray(periods)).astype(int)
+    sums = _daily_price_sums(data)
+    n = len(data['m'])
+    out = np.full((len(periods), n, len(ALL_ASSETS)), np.nan)
+    for j, a in enumerate(ALL_ASSETS):
+        cs, nan_cs, pos = sums[a]
+        # Month-end SMA of the previous month (the signal is lagged one month)
+        lag = np.concatenate([[-1], pos[:-1]])
+        end = lag[None, :] + 1
+        start = end - periods[:, None]
+        ok = (lag[None, :] >= 0) & (start >= 0)
+        s0 = np.maximum(start, 0)
+        sma = (cs[end] - cs[s0]) / periods[:, None]
+        ok &= (nan_cs[end] - nan_cs[s0]) == 0
+        px = data['signals'][f'{a}_px_lag'].to_numpy(dtype=float)
+        ok &= (sma > 0) & ~np.isnan(px)[None, :]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            out[:, :, j] = np.where(ok, px[None, :] / sma, np.nan)
+    return out
+
+
+def _get_sma_ratio(data, period):
+    """Lagged month-end price / SMA(period) per asset, indexed like data['m'].
+
+    NaN where the SMA filter does not apply (no SMA yet, or no lagged price).
+    """
+    ratio_cache = data['sma_ratio_cache']
+    if period not in ratio_cache:
+        ratio_cache[period] = pd.DataFrame(sma_ratio_matrix(data, [period])[0],
+                                           index=data['m'].index, columns=ALL_ASSETS)
+    return ratio_cache[period]
+
+
+def _get_sma_ratio_pandas(data, period):
+    """Reference pandas rolling-mean version of _get_sma_ratio(), used by verify_engines()."""
+    sma_raw, sma_monthly = _get_sma_series(data, period)
+    idx = data['m'].index
+    ratio = pd.DataFrame(index=idx, columns=ALL_ASSETS, dtype=float)
+    for a in ALL_ASSETS:
+        sma_val = sma_monthly[a].shift(1).reindex(idx)
+        price_val = data['signals'][f'{a}_px_lag']
+        ratio[a] = (price_val / sma_val).where(sma_val.notna() & (sma_val > 0) & price_val.notna())
+    return ratio
+
+
 def backtest(start_year=2000, end_year=2024,
              ath_params=None, gate=None, sma_params=None,
              intl_risk_power=None, ewy_share=None,
              intl_max_share=None,
-             verbose=True):
-    if ath_params is None:
-        ath_params = ATH_PARAMS
-    if gate is None:
-        gate = ATH_GATE
-    if sma_params is None:
-        sma_params = SMA_PARAMS
-    if intl_risk_power is None:
-        intl_risk_power = INTL_RISK_POWER
-    if ewy_share is None:
-        ewy_share = EWY_SHARE
-    if intl_max_share is None:
-        intl_max_share = INTL_ROTATION['max_share']
+             verbose=True, params=None):
+    """Scalar month-by-month reference engine.
+
+    params is a StrategyParams (default: module globals); the legacy keyword
+    arguments override the corresponding fields.
+    """
+    p = _resolve_params(params, ath_params, gate, sma_params,
+                        intl_risk_power, ewy_share, intl_max_share)
 
     data = _get_data()
     if data is None:
@@ -241,70 +627,44 @@ def backtest(start_year=2000, end_year=2024,
         return None
 
     m = data['m']
-    prices = data['prices']
-    ath_series = data['ath_series']
-    sma_period = sma_params['period']
-    sma_raw, sma_monthly = _get_sma_series(data, sma_period)
-    monthly_prices = data.get('monthly_prices', {})
+    sig = data['signals']
+    sma_ratio = _get_sma_ratio(data, p.sma_period)
 
     sr = []
     dates = []
     violations = []
 
     for i in range(1, len(m)):
-        prev, cur = m.iloc[i - 1], m.iloc[i]
+        prev, cur = sig.iloc[i - 1], m.iloc[i]
         if prev.name.year < start_year:
             continue
         if prev.name.year > end_year:
             break
 
-        cp = prev['CPI_YoY'] if pd.notna(prev['CPI_YoY']) else 2
-        ce = prev['CAPE'] if pd.notna(prev.get('CAPE')) else 25
-        ur = prev['UNRATE'] if pd.notna(prev['UNRATE']) else 5
-        yi = prev['yield_inv'] if pd.notna(prev['yield_inv']) else 0
-        rf = prev['FEDFUNDS_real'] if pd.notna(prev.get('FEDFUNDS_real')) else 0
-        ip = prev['INDPRO_growth'] if pd.notna(prev.get('INDPRO_growth')) else 0
-
-        rs, mod = continuous_allocation(cp, ce, ur, yi, rf, ip)
+        ce = prev['cape']
+        rs, mod = continuous_allocation(prev['cpi_yoy'], ce, prev['unrate'], prev['yield_inv'],
+                                        prev['fedfunds_real'], prev['indpro_growth'], params=p)
 
-        def inflation_gate(dcpi_yoy):
-            if not gate['enabled'] or pd.isna(dcpi_yoy):
-                return 1.0
-            return sigmoid(-dcpi_yoy + gate['thresh'], 0, gate['k'])
-
-        gate_val = inflation_gate(prev.get('dCPI_YoY', 0))
-
-        def get_ath_factor(a, date, series, param):
-            if param <= 0 or date not in series.index:
-                return 1.0
-            ath_v = series.loc[date]
-            pr = prices[a].loc[date]
-            if pr <= 0 or ath_v <= pr:
-                return 1.0
-            return 1 + (ath_v - pr) / pr * param
+        gate_val = 1.0
+        if p.gate_enabled and pd.notna(prev['dcpi_yoy']):
+            gate_val = sigmoid(-prev['dcpi_yoy'] + p.gate_thresh, 0, p.gate_k)
 
         ath_factors = {}
-        for a in ALL_ASSETS:
-            factor = get_ath_factor(a, prev.name, ath_series[a], ath_params.get(a, 0))
+        for a, param in p.ath_params:
+            factor = 1 + prev[f'{a}_ath_dd'] * param if param > 0 else 1.0
             if a in EQUITY_ASSETS:
                 factor = 1 + (factor - 1) * gate_val
             ath_factors[a] = factor
 
-        w = compute_weights(rs, mod, ce, ath_factors,
-                             intl_risk_power=intl_risk_power,
-                             ewy_share=ewy_share,
-                             intl_max_share=intl_max_share)
+        w = compute_weights(rs, mod, ce, ath_factors, params=p)
 
+        ratios = sma_ratio.iloc[i - 1]
         for a in list(w.keys()):
             rn = f'{a}_r'
             if rn not in cur or pd.isna(cur[rn]):
                 continue
-            if a in sma_monthly and prev.name in sma_monthly[a].shift(1).index and \
-               a in monthly_prices and prev.name in monthly_prices[a].shift(1).index:
-                sma_val = sma_monthly[a].shift(1).loc[prev.name]
-                price_val = monthly_prices[a].shift(1).loc[prev.name]
-                if pd.notna(sma_val) and sma_val > 0 and pd.notna(price_val):
-                    w[a] *= sigmoid(price_val / sma_val, 1.0, sma_params['k'])
+            if pd.notna(ratios[a]):
+                w[a] *= sigmoid(ratios[a], 1.0, p.sma_k)
 
         valid_w = {a: w[a] for a in list(w.keys())
                    if f'{a}_r' in cur and pd.notna(cur[f'{a}_r'])}
@@ -340,10 +700,1552 @@ def backtest(start_year=2000, end_year=2024,
     return sh, tr, dd
 
 
+# ── Vectorized backtest ───────────────────────────────────
+
+def _vector_inputs(data, p):
+    """Config-level inputs of _vector_returns that do not depend on the CAPE rotation.
+
+    Risk score, modulation, gated ATH factors, SMA trend factors and next-month
+    returns depend only on indicator, ATH, gate and SMA parameters, so they are
+    cached in data per parameter set with the three rotation fields zeroed.
+    """
+    key = p.replace(intl_risk_power=0.0, ewy_share=0.0, intl_max_share=0.0)
+    cache = data.setdefault('vector_inputs', {})
+    # Single dict operations only: another thread may clear the cache at any point
+    hit = cache.get(key)
+    if hit is not None:
+        return hit
+    if len(cache) >= 64:
+        cache.clear()
+
+    sig = data['signals'].iloc[:-1]
+    cur = data['m'].iloc[1:]
+    ce = sig['cape'].to_numpy(dtype=float)
+    rs, mod = continuous_allocation_array(
+        sig['cpi_yoy'].to_numpy(dtype=float), ce,
+        sig['unrate'].to_numpy(dtype=float), sig['yield_inv'].to_numpy(dtype=float),
+        sig['fedfunds_real'].to_numpy(dtype=float), sig['indpro_growth'].to_numpy(dtype=float),
+        params=p)
+
+    dcpi = sig['dcpi_yoy'].to_numpy(dtype=float)
+    if p.gate_enabled:
+        gate_val = np.where(np.isnan(dcpi), 1.0, sigmoid(-dcpi + p.gate_thresh, 0, p.gate_k))
+    else:
+        gate_val = np.ones(len(sig))
+
+    params = np.array([v for _, v in p.ath_params], dtype=float)
+    ath_dd = data['ath_dd'][:-1]
+    ath_factors = np.where(params > 0, 1 + ath_dd * params, 1.0)
+    equity = np.isin(ALL_ASSETS, EQUITY_ASSETS)
+    ath_factors[:, equity] = 1 + (ath_factors[:, equity] - 1) * gate_val[:, None]
+
+    # SMA trend filter on the month before prev
+    ratio = _get_sma_ratio(data, p.sma_period).iloc[:-1].to_numpy(dtype=float)
+    sma_f = np.where(np.isnan(ratio), 1.0, sigmoid(ratio, 1.0, p.sma_k))
+
+    r = cur[[f'{a}_r' for a in ALL_ASSETS]].to_numpy(dtype=float)
+    inputs = {'prev_index': sig.index, 'cur_index': cur.index, 'cape': ce, 'rs': rs, 'm': mod,
+              'ath_factors': ath_factors, 'sma_f': sma_f, 'r': r}
+    cache[key] = inputs
+    return inputs
+
+
+def _vector_returns(data, p, rows=slice(None)):
+    """Strategy returns for every month of data['m'] at once under StrategyParams p.
+
+    Row j describes the transition prev = month j -> cur = month j + 1,
+    exactly as one iteration of the loop in backtest(). rows restricts the
+    computation to a slice of those transitions (each month is independent).
+    Returns (prev_index, cur_index, weights, returns, weight_sums).
+    """
+    inp = _vector_inputs(data, p)
+    w = compute_weights_array(inp['rs'][rows], inp['m'][rows], inp['cape'][rows],
+                              inp['ath_factors'][rows], params=p)
+    w = w * inp['sma_f'][rows]
+
+    # Drop assets without a return this month and renormalize
+    r = inp['r'][rows]
+    valid = ~np.isnan(r)
+    w = np.where(valid, w, 0.0)
+    tw = w.sum(axis=1, keepdims=True)
+    w = np.divide(w, tw, out=w.copy(), where=tw > 0)
+    ret = np.einsum('ij,ij->i', w, np.where(valid, r, 0.0))
+    return inp['prev_index'][rows], inp['cur_index'][rows], w, ret, w.sum(axis=1)
+
+
+def cost_vector(cost_bps=None):
+    """(assets,) cost per unit of weight traded, from basis points (default: COST_BPS)."""
+    bps = COST_BPS if cost_bps is None else cost_bps
+    return np.array([bps.get(a, 0.0) for a in ALL_ASSETS], dtype=float) / 1e4
+
+
+def rebalance_trades(w, r):
+    """Weight traded per asset at every monthly rebalance.
+
+    w is (..., months, assets) post-rebalance weights and r the (months, assets)
+    asset returns earned on them (NaN: no return). Between rebalances the
+    previous weights drift with their returns, so row j trades
+    |w_j - drift(w_{j-1})|; row 0 has no previous portfolio and trades
+    nothing. One-way turnover is the sum over assets / 2.
+    """
+    trades = np.empty_like(w)
+    trades[..., 0, :] = 0.0
+    # Drifted previous weights, built in place in the output to keep sweeps cheap
+    drift = trades[..., 1:, :]
+    np.multiply(w[..., :-1, :], 1 + np.where(np.isnan(r[:-1]), 0.0, r[:-1]), out=drift)
+    tot = drift.sum(axis=-1, keepdims=True)
+    np.divide(drift, tot, out=drift, where=tot > 0)
+    np.subtract(w[..., 1:, :], drift, out=drift)
+    np.abs(drift, out=drift)
+    return trades
+
+
+def backtest_net(start_year=2000, end_year=2024, params=None, cost_bps=None):
+    """Turnover and cost-adjusted metrics of the vectorized backtest.
+
+    Each month's return is reduced by the cost of that month's rebalance,
+    (1 + r) * (1 - cost) - 1, with cost the traded weight per asset times its
+    cost_bps (default: COST_BPS). Returns a dict with gross sh/tr/dd, net
+    nsh/ntr/ndd, one-way turnover and cost drag (both per year), or None.
+    """
+    data = _get_data()
+    if data is None:
+        print('ERROR: Missing data')
+        return None
+    p = params if params is not None else default_params()
+    prev_idx, _, w, ret, _ = _vector_returns(data, p)
+    trades = rebalance_trades(w, _vector_inputs(data, p)['r'])
+    cost = trades @ cost_vector(cost_bps)
+    net = (1 + ret) * (1 - cost) - 1
+
+    sel = (prev_idx.year >= start_year) & (prev_idx.year <= end_year) & ~np.isnan(ret)
+    if not sel.any():
+        return None
+    out = {'turnover': float(trades[sel].sum(axis=1).mean() / 2 * 12), 'cost': float(cost[sel].mean() * 12)}
+    for prefix, r in (('', ret[sel]), ('n', net[sel])):
+        cum = np.cumprod(1 + r)
+        out[f'{prefix}sh'] = float(np.mean(r) / np.std(r) * np.sqrt(12))
+        out[f'{prefix}tr'] = float(cum[-1] - 1)
+        out[f'{prefix}dd'] = float((cum / np.maximum.accumulate(cum) - 1).min())
+    return out
+
+
+def backtest_vectorized(start_year=2000, end_year=2024,
+                        ath_params=None, gate=None, sma_params=None,
+                        intl_risk_power=None, ewy_share=None,
+                        intl_max_share=None,
+                        verbose=True, params=None):
+    """Same contract as backtest(), computed with array ops over all months at once."""
+    p = _resolve_params(params, ath_params, gate, sma_params,
+                        intl_risk_power, ewy_share, intl_max_share)
+
+    data = _get_data()
+    if data is None:
+        if verbose: print('ERROR: Missing data')
+        return None
+
+    prev_idx, cur_idx, w, ret, wsum = _vector_returns(data, p)
+
+    sel = (prev_idx.year >= start_year) & (prev_idx.year <= end_year)
+    ret, wsum = ret[sel], wsum[sel]
+
+    bad = np.flatnonzero(np.abs(wsum - 1.0) > 0.01)
+    if len(bad) and verbose:
+        print(f"⚠ {len(bad)} weight-sum violations (first 3):")
+        for j in bad[:3]:
+            print(f"  {prev_idx[sel][j].date()}: weights sum to {wsum[j]:.4f}")
+
+    keep = ~np.isnan(ret)
+    sr = ret[keep]
+    if len(sr) == 0 or np.std(sr) == 0:
+        if verbose: print('ERROR: No valid returns')
+        return None
+
+    tr = float(np.prod(1 + sr) - 1)
+    sh = float(np.mean(sr) / np.std(sr) * np.sqrt(12))
+    cum = np.cumprod(1 + sr)
+    dd = float((cum / np.maximum.accumulate(cum) - 1).min())
+    return sh, tr, dd
+
+
+def _window_stats(rets, years, windows):
+    """Score many windows of one or more return paths in a single pass.
+
+    rets is (C, months) and years the (months,) year of each row's rebalance
+    month. Windows are contiguous slices, so mean and std come from cumulative
+    sums of r and r², total return from the cumulative product, and drawdown
+    from a running max over the cumulative product within the slice.
+    Returns {(start_year, end_year): (sharpe, total_return, max_drawdown)} of (C,) arrays.
+    """
+    n_cfg = rets.shape[0]
+    zero = np.zeros((n_cfg, 1))
+    s1 = np.concatenate([zero, np.cumsum(rets, axis=1)], axis=1)
+    s2 = np.concatenate([zero, np.cumsum(rets * rets, axis=1)], axis=1)
+    cum = np.concatenate([zero + 1, np.cumprod(1 + rets, axis=1)], axis=1)
+
+    out = {}
+    for sy, ey in windows:
+        a = np.searchsorted(years, sy, side='left')
+        b = np.searchsorted(years, ey, side='right')
+        n = b - a
+        if n <= 0:
+            nan = np.full(n_cfg, np.nan)
+            out[(sy, ey)] = (nan, nan, nan)
+            continue
+        mean = (s1[:, b] - s1[:, a]) / n
+        sd = np.sqrt(np.maximum((s2[:, b] - s2[:, a]) / n - mean * mean, 0))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            sh = np.where(sd > 0, mean / sd * np.sqrt(12), np.nan)
+        tr = cum[:, b] / cum[:, a] - 1
+        path = cum[:, a + 1:b + 1]
+        dd = (path / np.maximum.accumulate(path, axis=1) - 1).min(axis=1)
+        out[(sy, ey)] = (sh, tr, dd)
+    return out
+
+
+ROLLING_WINDOWS = (12, 36, 60)
+
+
+def sliding_max(x, w):
+    """Max of every length-w window along the last axis, O(n) for any w.
+
+    Van Herk/Gil-Werman: the axis is cut into blocks of w, and each window
+    spans the suffix of one block and the prefix of the next, so its max is
+    max(suffix_max[i], prefix_max[i + w - 1]). This is the array form of the
+    monotonic-deque sliding max and vectorizes over leading (config) axes.
+    Returns shape (..., n - w + 1); entry i is max(x[..., i:i + w]).
+    """
+    x = np.asarray(x, dtype=float)
+    n = x.shape[-1]
+    if w > n:
+        return np.empty(x.shape[:-1] + (0,))
+    pad = (-n) % w
+    xp = np.concatenate([x, np.full(x.shape[:-1] + (pad,), -np.inf)], axis=-1)
+    blocks = xp.reshape(x.shape[:-1] + (-1, w))
+    prefix = np.maximum.accumulate(blocks, axis=-1).reshape(xp.shape)
+    suffix = np.flip(np.maximum.accumulate(np.flip(blocks, -1), axis=-1), -1).reshape(xp.shape)
+    return np.maximum(suffix[..., :n - w + 1], prefix[..., w - 1:n])
+
+
+def rolling_metrics(returns, windows=ROLLING_WINDOWS):
+    """Trailing Sharpe, volatility, return and drawdown for every month, in O(n).
+
+    returns is a Series of monthly returns, or an array of shape (months,) or
+    (configs, months). For each window w (months), entry t covers returns
+    t - w + 1 .. t: mean and std come from cumulative sums of r and r², the
+    compounded return from cumulative log growth, and the drawdown is the
+    month-t level against the trailing high of the window's w + 1 levels
+    (sliding_max). Sharpe and volatility are annualized; the first w - 1
+    entries are NaN. A Series gives a DataFrame with columns sharpe_<w>,
+    vol_<w>, return_<w>, dd_<w>; an array gives a dict of same-shape arrays.
+    """
+    index = returns.index if isinstance(returns, pd.Series) else None
+    r = np.asarray(returns, dtype=float)
+    zero = np.zeros(r.shape[:-1] + (1,))
+    s1 = np.concatenate([zero, np.cumsum(r, axis=-1)], axis=-1)
+    s2 = np.concatenate([zero, np.cumsum(r * r, axis=-1)], axis=-1)
+    lg = np.concatenate([zero, np.cumsum(np.log1p(r), axis=-1)], axis=-1)
+    n = r.shape[-1]
+
+    out = {}
+    for w in windows:
+        cols = {k: np.full(r.shape, np.nan) for k in ('sharpe', 'vol', 'return', 'dd')}
+        if w <= n:
+            mean = (s1[..., w:] - s1[..., :-w]) / w
+            sd = np.sqrt(np.maximum((s2[..., w:] - s2[..., :-w]) / w - mean * mean, 0))
+            with np.errstate(invalid='ignore', divide='ignore'):
+                cols['sharpe'][..., w - 1:] = np.where(sd > 0, mean / sd * np.sqrt(12), np.nan)
+            cols['vol'][..., w - 1:] = sd * np.sqrt(12)
+            cols['return'][..., w - 1:] = np.expm1(lg[..., w:] - lg[..., :-w])
+            # log levels: the high over levels t - w + 1 .. t + 1 (w + 1 points)
+            cols['dd'][..., w - 1:] = np.expm1(lg[..., w:] - sliding_max(lg, w + 1))
+        for k, v in cols.items():
+            out[f'{k}_{w}'] = v
+    if index is not None:
+        return pd.DataFrame(out, index=index)
+    return out
+
+
+def backtest_returns(start_year=1965, end_year=2024, params=None, **overrides):
+    """Monthly st8 returns as a Series indexed by the month they are earned in.
+
+    Rows are selected by rebalance year as in backtest(); overrides are the
+    legacy keyword arguments (ath_params, gate, intl_risk_power, ...).
+    """
+    data = _get_data()
+    if data is None:
+        print('ERROR: Missing data')
+        return None
+    p = _resolve_params(params, **overrides)
+    prev_idx, cur_idx, _, ret, _ = _vector_returns(data, p)
+    sel = (prev_idx.year >= start_year) & (prev_idx.year <= end_year) & ~np.isnan(ret)
+    return pd.Series(ret[sel], index=cur_idx[sel], name='st8')
+
+
+def backtest_rolling(start_year=1965, end_year=2024, windows=ROLLING_WINDOWS, params=None, **overrides):
+    """rolling_metrics() of backtest_returns(): one row per month, four columns per window."""
+    r = backtest_returns(start_year, end_year, params=params, **overrides)
+    return None if r is None else rolling_metrics(r, windows)
+
+
+def plot_rolling(roll, spy_roll=None, path=None, windows=ROLLING_WINDOWS):
+    """Four panels (Sharpe, volatility, return, drawdown) of rolling metrics per window."""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import matplotlib.ticker as mticker
+
+    if path is None:
+        os.makedirs(PLOTS_DIR, exist_ok=True)
+        path = os.path.join(PLOTS_DIR, 'rolling_metrics.png')
+    colors = ['#93C5FD', '#2563EB', '#1E3A8A']
+    panels = [('sharpe', 'Rolling Sharpe', False), ('vol', 'Rolling volatility (annualized)', True),
+              ('return', 'Rolling return (compounded)', True), ('dd', 'Drawdown from trailing high', True)]
+    fig, axes = plt.subplots(4, 1, figsize=(12, 12), sharex=True)
+    for ax, (key, title, pct) in zip(axes, panels):
+        for w, c in zip(windows, colors):
+            ax.plot(roll.index, roll[f'{key}_{w}'], linewidth=1.1, color=c, label=f'st8 {w}m')
+        if spy_roll is not None:
+            w = windows[len(windows) // 2]
+            ax.plot(spy_roll.index, spy_roll[f'{key}_{w}'], linewidth=1, linestyle='--',
+                    color='#9CA3AF', label=f'SPY {w}m')
+        ax.axhline(0, color='black', linewidth=0.6, alpha=0.5)
+        if pct:
+            ax.yaxis.set_major_formatter(mticker.PercentFormatter(1.0))
+        ax.set_title(title, fontsize=10)
+        ax.grid(True, alpha=0.3)
+    axes[0].legend(loc='upper left', fontsize=8, ncol=len(windows) + 1)
+    fig.tight_layout()
+    fig.savefig(path, dpi=110)
+    plt.close(fig)
+    return path
+
+
+def show_rolling(start_year=1965, end_year=2024, windows=ROLLING_WINDOWS):
+    """Print rolling-metric ranges for st8 vs SPY and save the rolling plot."""
+    roll = backtest_rolling(start_year, end_year, windows)
+    if roll is None:
+        return None
+    data = _get_data()
+    spy = data['m']['SPY_r'].loc[roll.index]
+    spy_roll = rolling_metrics(spy, windows)
+    print(f"\n{'=' * 60}")
+    print(f"Rolling metrics ({roll.index[0]:%Y-%m} to {roll.index[-1]:%Y-%m})")
+    print(f"{'=' * 60}")
+    print(f"{'':6s} {'':6s} {'Sh min':>7s} {'Sh med':>7s} {'Vol med':>7s} {'Ret<0':>6s} {'DD min':>7s}")
+    for w in windows:
+        for name, df in (('st8', roll), ('SPY', spy_roll)):
+            sh, ret, dd = df[f'sharpe_{w}'].dropna(), df[f'return_{w}'].dropna(), df[f'dd_{w}'].dropna()
+            print(f"{w:>4d}m  {name:6s} {sh.min():7.2f} {sh.median():7.2f} "
+                  f"{df[f'vol_{w}'].median()*100:6.1f}% {(ret < 0).mean()*100:5.0f}% {dd.min()*100:6.1f}%")
+    print(f"\nPlot: {plot_rolling(roll, spy_roll, windows=windows)}")
+    return roll
+
+
+def _get_result_cache():
+    global _RESULT_CACHE
+    if _RESULT_CACHE is None:
+        _RESULT_CACHE = ResultCache(RESULT_CACHE_DIR, int(RESULT_CACHE_MAX_MB * 2**20))
+    return _RESULT_CACHE
+
+
+_RESULT_CACHE = None
+
+
+def _data_fingerprint():
+    """Content hashes of every data_cache file the backtest reads."""
+    files = [fn for _, fn in FRED_FILES] + [f'YF_{a}.csv' for a in ALL_ASSETS] + ['SHILLER_CAPE.csv']
+    return fingerprint_files(os.path.join(DATA_DIR, fn) for fn in files)
+
+
+def _result_cache_key(p):
+    """Cache key covering the input data and every field of StrategyParams p."""
+    return ResultCache.key({
+        'version': RESULT_CACHE_VERSION,
+        'data': _data_fingerprint(),
+        'assets': ALL_ASSETS,
+        'params': p.to_dict(),
+    })
+
+
+def backtest_windows(windows=OPT_WINDOWS,
+                     ath_params=None, gate=None, sma_params=None,
+                     intl_risk_power=None, ewy_share=None,
+                     intl_max_share=None,
+                     verbose=True, use_cache=True, params=None):
+    """Run the strategy once and score every (start_year, end_year) window.
+
+    The strategy is stateless month to month, so each window's returns are a
+    slice of the full-history path. With use_cache the return path and window
+    metrics are stored in the on-disk result cache, keyed by the data files and
+    all parameters. Returns {window: (sharpe, total_return, max_drawdown)},
+    with None for windows that have no valid returns, or None if data is missing.
+    """
+    p = _resolve_params(params, ath_params, gate, sma_params,
+                        intl_risk_power, ewy_share, intl_max_share)
+
+    windows = [tuple(w) for w in windows]
+    cache = key = entry = None
+    if use_cache:
+        cache = _get_result_cache()
+        key = _result_cache_key(p)
+        entry = cache.get(key)
+        if entry is not None and all(w in entry['metrics'] for w in windows):
+            return {w: entry['metrics'][w] for w in windows}
+
+    if entry is not None:
+        returns = entry['returns']
+        ret, years = returns.to_numpy(), returns.index.year.to_numpy()
+    else:
+        data = _get_data()
+        if data is None:
+            if verbose: print('ERROR: Missing data')
+            return None
+
+        prev_idx, cur_idx, w, ret, wsum = _vector_returns(data, p)
+        years = prev_idx.year.to_numpy()
+
+        if verbose:
+            lo, hi = min(w[0] for w in windows), max(w[1] for w in windows)
+            sel = (years >= lo) & (years <= hi)
+            bad = np.flatnonzero(sel & (np.abs(wsum - 1.0) > 0.01))
+            if len(bad):
+                print(f"⚠ {len(bad)} weight-sum violations (first 3):")
+                for j in bad[:3]:
+                    print(f"  {prev_idx[j].date()}: weights sum to {wsum[j]:.4f}")
+
+        keep = ~np.isnan(ret)
+        ret, years = ret[keep], years[keep]
+        # Indexed by rebalance (prev) month, which is what windows select on
+        returns = pd.Series(ret, index=prev_idx[keep], name='st8')
+        entry = {'returns': returns, 'metrics': {}}
+
+    stats = _window_stats(ret[None, :], years, windows)
+    out = {}
+    for win, (sh, tr, dd) in stats.items():
+        if np.isnan(sh[0]):
+            if verbose: print(f'ERROR: No valid returns for {win[0]}-{win[1]}')
+            out[win] = None
+        else:
+            out[win] = (float(sh[0]), float(tr[0]), float(dd[0]))
+
+    if cache is not None:
+        entry['metrics'].update(out)
+        cache.put(key, entry)
+    return out
+
+
+def cache_command(action='info'):
+    """Inspect or clear the on-disk result cache."""
+    cache = _get_result_cache()
+    if action == 'clear':
+        print(f"Removed {cache.clear()} cached results from {cache.directory}")
+        return
+    s = cache.stats()
+    print(f"Result cache: {s['directory']}")
+    print(f"  Entries: {s['entries']}")
+    print(f"  Size:    {s['bytes'] / 2**20:.2f} MB / {s['max_bytes'] / 2**20:.0f} MB")
+    if s['entries']:
+        print(f"  Oldest:  {datetime.fromtimestamp(s['oldest']):%Y-%m-%d %H:%M}")
+        print(f"  Newest:  {datetime.fromtimestamp(s['newest']):%Y-%m-%d %H:%M}")
+    print(f"  Data:    {ResultCache.key(_data_fingerprint())[:12]} (data_cache fingerprint)")
+
+def verify_engines(windows=OPT_WINDOWS, tol=1e-9):
+    """Compare backtest() with backtest_vectorized() and backtest_windows() on a few configs,
+    and daily_simulation() with daily_operation's diff-trade functions."""
+    base = default_params()
+    ind = {n: {'c': c, 'k': k, 'w': w} for n, c, k, w in base.indicators}
+    ind['CPI'] = dict(ind['CPI'], c=3.0)
+    configs = [{}, {'intl_risk_power': 0, 'ewy_share': 1.0},
+               {'intl_risk_power': 5.0, 'ewy_share': 0.0, 'intl_max_share': 0.5},
+               {'params': base.replace(indicators=ind, intl_center=26.0, gate_thresh=0.2)}]
+    ok = True
+    for cfg in configs:
+        label = str(cfg) if 'params' not in cfg else "params: CPI c=3, intl_center=26, gate_thresh=0.2"
+        multi = backtest_windows(windows, verbose=False, use_cache=False, **cfg)
+        for sy, ey in windows:
+            a = backtest(sy, ey, verbose=False, **cfg)
+            b = backtest_vectorized(sy, ey, verbose=False, **cfg)
+            c = multi[(sy, ey)]
+            diff = max(abs(x - y) for x, y in zip(a + a, b + c))
+            ok &= diff <= tol
+            print(f"  {sy}-{ey} {label:60s} max |Δ| = {diff:.2e}")
+    data = _get_data()
+    for period in (50, SMA_PARAMS['period'], 300):
+        a = _get_sma_ratio_pandas(data, period).to_numpy(dtype=float)
+        b = sma_ratio_matrix(data, [period])[0]
+        same_nan = bool((np.isnan(a) == np.isnan(b)).all())
+        diff = float(np.nanmax(np.abs(a - b)))
+        ok &= same_nan and diff <= tol
+        print(f"  SMA ratio period={period:<4d} cumsum vs rolling max |Δ| = {diff:.2e}"
+              f"{'' if same_nan else '  (NaN mask differs)'}")
+    # daily_simulation() inlines the live diff-trade logic; replay the same
+    # targets through daily_operation's own functions and compare values.
+    # Imported here because daily_operation imports this module.
+    import daily_operation
+    for budget, invested in ((500.0, False), (None, True)):
+        sim = daily_simulation(start='2004-01-01', end='2006-12-31', budget=budget, invested=invested)
+        days = sim['value'].index
+        _, px = _daily_targets(data, default_params(), days)
+        px = np.nan_to_num(pd.DataFrame(px).ffill().to_numpy())
+        cash = 100000.0
+        shares = {a: 0.0 for a in ALL_ASSETS}
+        if invested:
+            shares = {a: sim['target'][0, j] * cash / px[0, j] if px[0, j] > 0 else 0.0
+                      for j, a in enumerate(ALL_ASSETS)}
+            cash = 0.0
+        value = np.empty(len(days))
+        for i in range(len(days)):
+            prices = dict(zip(ALL_ASSETS, px[i]))
+            total = daily_operation.calc_portfolio_value(shares, prices) + cash
+            trades = daily_operation.compute_diff_trades(dict(zip(ALL_ASSETS, sim['target'][i])), shares,
+                                                         prices, total if budget is None else budget, total)
+            shares, cash = daily_operation.execute_diff_trades(trades, prices, shares, cash)
+            value[i] = daily_operation.calc_portfolio_value(shares, prices) + cash
+        diff = float(np.max(np.abs(value - sim['value'].to_numpy())) / 100000.0)
+        ok &= diff <= tol
+        label = 'uncapped, invested' if budget is None else f'${budget:,.0f}/day, from cash'
+        print(f"  daily replay {label:22s} vs daily_operation diff trades max |Δ|/cash = {diff:.2e}")
+    # A checkpointed sweep spanning several chunks, written then resumed from the file
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'checkpoint.csv')
+        grid = sweep_grid(sma_k=[5, 10, 20, 40], ewy_share=np.linspace(0, 1, 60))
+        ref = sweep_kernel(chunk_size=100, **grid)
+        first = sweep_kernel(chunk_size=100, checkpoint=path, **grid)
+        resumed = sweep_kernel(chunk_size=100, checkpoint=path, **grid)
+        diff = max(float(np.max(np.abs(df['score'] - ref['score']))) for df in (first, resumed))
+        ok &= diff <= tol
+        print(f"  checkpointed sweep, {len(ref)} configs in chunks of 100, written and resumed max |Δ| = {diff:.2e}")
+    print('OK' if ok else 'MISMATCH')
+    return ok
+
+
+# ── Batched sweep kernel ──────────────────────────────────
+
+SWEEP_PARAMS = ['intl_risk_power', 'ewy_share', 'intl_max_share', 'sma_period', 'sma_k', 'gate_k']
+PARAM_LABELS = {'intl_risk_power': 'Power', 'ewy_share': 'EWY_Sh', 'intl_max_share': 'MaxSh',
+                'sma_period': 'SMA_p', 'sma_k': 'SMA_k', 'gate_k': 'Gate_k'}
+
+
+def window_label(start_year, end_year):
+    """Column suffix for a window, e.g. (2011, 2024) -> '14'."""
+    return f'{end_year - start_year + 1}'
+
+
+def indicator_column(name, key):
+    """Sweep column for one INDICATORS entry, e.g. ('CPI', 'c') -> 'CPI_c'."""
+    return f'{name}_{key}'
+
+
+def alloc_column(sleeve, key):
+    """Sweep column for one ALLOC_COEFS entry, e.g. ('TLT', 'rs') -> 'TLT_rs'."""
+    return f'{sleeve}_{key}'
+
+
+def lag_column(name):
+    """Sweep column for the publication lag of one FRED series, e.g. 'CPI' -> 'lag_CPI'."""
+    return f'lag_{name}'
+
+
+def sweep_columns(base=None):
+    """Every column sweep_kernel() accepts with its base value, grouped by the input it feeds.
+
+    'params' are SWEEP_PARAMS and 'ath' the per-asset ATH multipliers
+    (ath_SPY, ...); both are always part of a sweep. The other groups enter
+    only when one of their columns is given: 'indicators' (indicator_column(),
+    e.g. CPI_c), 'lags' (lag_column() publication lags in days, e.g. lag_CPI),
+    'yield_gate' (1/0: 0 scores UNRATE risk without the yield-inversion
+    condition) and 'alloc' (alloc_column() allocation-line coefficients, e.g.
+    TLT_rs). Base values come from the StrategyParams base (default: module
+    globals). Returns {group: {column: value}}.
+    """
+    if base is None:
+        base = default_params()
+    return {
+        'params': {p: getattr(base, p) for p in SWEEP_PARAMS},
+        'ath': {f'ath_{a}': base.ath.get(a, 0) for a in ALL_ASSETS},
+        'indicators': {indicator_column(name, key): v for name, c, k, w in base.indicators
+                       for key, v in (('c', c), ('k', k), ('w', w))},
+        'lags': {lag_column(n): FRED_LAG_DAYS for n, _ in FRED_FILES},
+        'yield_gate': {'yield_gate': 1},
+        'alloc': {alloc_column(sleeve, key): v for sleeve, coefs in base.alloc_coefs.items()
+                  for key, v in coefs.items()},
+    }
+
+
+def _sweep_param_arrays(base=None, **columns):
+    """Broadcast sweep columns (scalars or length-C arrays) to one {column: (C,) array} mapping.
+
+    Every column of a sweep_columns() group that is part of the sweep is
+    filled in, taking its base value when not given (or None). Raises
+    ValueError for a column sweep_columns() does not know.
+    """
+    groups = sweep_columns(base)
+    unknown = sorted(set(columns) - {c for g in groups.values() for c in g})
+    if unknown:
+        raise ValueError(f"Unknown sweep columns: {', '.join(unknown)}")
+    cols = {}
+    for group, defaults in groups.items():
+        if group in ('params', 'ath') or any(c in columns for c in defaults):
+            for c, v in defaults.items():
+                given = columns.get(c)
+                cols[c] = np.atleast_1d(np.asarray(v if given is None else given, dtype=float))
+    shape = np.broadcast_shapes(*(v.shape for v in cols.values()))
+    return {c: np.broadcast_to(v, shape) for c, v in cols.items()}
+
+
+def _batch_returns(data, cols, gate=None, base=None, cost=None):
+    """Monthly returns for C configs at once.
+
+    cols holds (C,) arrays per sweep column (see _sweep_param_arrays());
+    every input the strategy needs is derived from it: SWEEP_PARAMS and the
+    ath_* multipliers always, per-config indicator curves, FRED publication
+    lags (macro inputs re-derived from the raw series via macro_signals()),
+    the yield-inversion switch and the allocation-line matrix when their
+    columns are present. Everything else (CAPE rotation curve, gate switch
+    and threshold, any group not swept) comes from the StrategyParams base,
+    with gate overriding its gate fields. Weights are built as a (C, months,
+    assets) tensor; returns are (C, months), row j of the month axis being the
+    same transition as row j of _vector_returns(). With cost, a
+    cost_vector(), returns (returns, one-way turnover, cost), each (C, months),
+    from rebalance_trades() on the same tensor.
+    """
+    base = _resolve_params(base, gate=gate)
+    m = data['m']
+    sig = data['signals'].iloc[:-1]
+
+    ce = sig['cape'].to_numpy(dtype=float)
+    indicators = None
+    if indicator_column(base.indicators[0][0], 'c') in cols:
+        # (C, 1) curves against (months,) inputs -> (C, months) risk scores
+        indicators = {name: {key: cols[indicator_column(name, key)][:, None] for key in 'ckw'}
+                      for name, _, _, _ in base.indicators}
+    if lag_column(FRED_FILES[0][0]) in cols:
+        lags = {n: cols[lag_column(n)] for n, _ in FRED_FILES}
+        macro = {c: v[..., :-1] for c, v in macro_signals(data, lags).items()}
+    else:
+        macro = {col: sig[col].to_numpy(dtype=float) for col in MACRO_SIGNALS}
+    if 'yield_gate' in cols:
+        macro['yield_inv'] = np.where(cols['yield_gate'][:, None] > 0, macro['yield_inv'], 1.0)
+    alloc = None
+    if alloc_column(ALLOC_SLEEVES[0], 'base') in cols:
+        alloc = np.stack([np.stack([cols[alloc_column(s, k)] for k in ('base', 'rs', 'm')], axis=-1)
+                          for s in ALLOC_SLEEVES], axis=1)
+    rs, mod = continuous_allocation_array(
+        macro['cpi_yoy'], ce, macro['unrate'], macro['yield_inv'],
+        macro['fedfunds_real'], macro['indpro_growth'],
+        params=base, indicators=indicators)
+    rs, mod = np.atleast_2d(rs), np.atleast_2d(mod)
+
+    dcpi = np.atleast_2d(macro['dcpi_yoy'])
+    if base.gate_enabled:
+        gate_val = sigmoid(-dcpi + base.gate_thresh, 0, cols['gate_k'][:, None])
+        gate_val = np.where(np.isnan(dcpi), 1.0, gate_val)
+    else:
+        gate_val = np.ones((len(cols['gate_k']), len(sig)))
+
+    ath = np.stack([cols[f'ath_{a}'] for a in ALL_ASSETS], axis=-1)
+    ath_dd = data['ath_dd'][:-1]
+    ath_factors = np.where(ath[:, None, :] > 0, 1 + ath_dd[None, :, :] * ath[:, None, :], 1.0)
+    equity = np.isin(ALL_ASSETS, EQUITY_ASSETS)
+    ath_factors[:, :, equity] = 1 + (ath_factors[:, :, equity] - 1) * gate_val[:, :, None]
+
+    w = compute_weights_array(rs, mod, ce[None, :], ath_factors,
+                              intl_risk_power=cols['intl_risk_power'][:, None],
+                              ewy_share=cols['ewy_share'][:, None],
+                              intl_max_share=cols['intl_max_share'][:, None],
+                              params=base, alloc=None if alloc is None else alloc[:, None])
+
+    periods, which = np.unique(cols['sma_period'].astype(int), return_inverse=True)
+    ratio = sma_ratio_matrix(data, periods)[which, :-1, :]
+    sma_f = sigmoid(ratio, 1.0, cols['sma_k'][:, None, None])
+    w = w * np.where(np.isnan(ratio), 1.0, sma_f)
+
+    r = m.iloc[1:][[f'{a}_r' for a in ALL_ASSETS]].to_numpy(dtype=float)
+    valid = ~np.isnan(r)
+    w = np.where(valid[None, :, :], w, 0.0)
+    tw = w.sum(axis=-1, keepdims=True)
+    w = np.divide(w, tw, out=w.copy(), where=tw > 0)
+    rets = np.einsum('cma,ma->cm', w, np.where(valid, r, 0.0))
+    if cost is None:
+        return rets
+    trades = rebalance_trades(w, r)
+    return rets, trades.sum(axis=-1) / 2, trades @ cost
+
+
+def dd_limit(window):
+    """Drawdown limit for a window: OPT_DD_LIMITS, else that of the optimizer window closest in length."""
+    if window in OPT_DD_LIMITS:
+        return OPT_DD_LIMITS[window]
+    nearest = min(OPT_DD_LIMITS, key=lambda w: abs((w[1] - w[0]) - (window[1] - window[0])))
+    return OPT_DD_LIMITS[nearest]
+
+
+def score_configs(df, windows=OPT_WINDOWS):
+    """Optimizer objective: mean Sharpe over windows, halved if any drawdown limit is breached."""
+    score = sum(df[f'sh{window_label(*w)}'] for w in windows) / len(windows)
+    breach = np.zeros(len(df), dtype=bool)
+    for w in windows:
+        if w in OPT_DD_LIMITS:
+            breach |= (df[f'dd{window_label(*w)}'] < OPT_DD_LIMITS[w]).to_numpy()
+    return score.where(~breach, score * 0.5)
+
+
+def is_metric_column(col):
+    """True for sweep metric columns (sh14, tr25, dd60, to14, nsh60, score), False for parameters."""
+    return col == 'score' or bool(re.match(r'^(n?sh|n?tr|n?dd|to)\d+$', col))
+
+
+def store_results(df, source):
+    """Append a sweep/optimizer result frame to the results store as a new run."""
+    store = ResultStore(RESULTS_DB)
+    run_id = store.write(df, source=source, param_cols=[c for c in df if not is_metric_column(c)])
+    print(f"Stored {len(df):,} rows as run #{run_id} ({source}) in {store.path}")
+    return run_id
+
+
+def results_command(argv):
+    """Query the results store: filter, sort and aggregate without re-running anything.
+
+    results [--where EXPR] [--sort COL] [--asc] [--top N]
+            [--group-by COLS --metric COL [--agg max|min|avg]]
+            [--run latest|all|ID] [--source NAME] [--runs]
+    """
+    opts = {'where': None, 'sort': None, 'top': 20, 'group_by': None, 'metric': None,
+            'agg': 'max', 'run': 'latest', 'source': None, 'asc': False, 'runs': False}
+    opts.update(_cli_options(argv, where=str, sort=str, top=int, group_by=str, metric=str,
+                             agg=str, run=str, source=str, asc=bool, runs=bool))
+
+    store = ResultStore(RESULTS_DB)
+    if opts['runs']:
+        runs = store.runs()
+        print(f"{store!r}")
+        if len(runs):
+            print(runs[['run_id', 'source', 'created', 'rows', 'params']].to_string(index=False))
+        return runs
+
+    t0 = time.time()
+    try:
+        df = store.query(where=opts['where'], sort=opts['sort'] or opts['metric'] or 'score',
+                         ascending=opts['asc'], limit=opts['top'],
+                         group_by=opts['group_by'], metric=opts['metric'] or 'score',
+                         agg=opts['agg'], run=opts['run'], source=opts['source'])
+    except Exception as e:
+        print(f"ERROR: {e}")
+        return None
+    if df.empty:
+        print(f"No matching results in {store.path}")
+        return df
+
+    # Hide columns that are empty or identical on every row, but list the fixed values
+    df = df.dropna(axis=1, how='all')
+    fixed = {c: df[c].iloc[0] for c in df if c != 'n' and len(df) > 1 and df[c].nunique() == 1}
+    shown = df[[c for c in df if c not in fixed]]
+    print(f"{len(df)} rows in {(time.time() - t0) * 1000:.0f} ms from {store.path}")
+    if fixed:
+        print('Fixed: ' + ', '.join(f'{c}={v:g}' for c, v in fixed.items()))
+    print(shown.to_string(index=False, float_format=lambda v: f'{v:.4f}'))
+    return df
+
+
+def _complete_length(path):
+    """Byte length of a file up to and including its last newline.
+
+    Rows are appended one line at a time, so anything after the last newline
+    was cut off by an interrupted write.
+    """
+    with open(path, 'rb') as f:
+        end = f.seek(0, os.SEEK_END)
+        while end > 0:
+            start = max(0, end - 65536)
+            f.seek(start)
+            pos = f.read(end - start).rfind(b'\n')
+            if pos >= 0:
+                return start + pos + 1
+            end = start
+    return 0
+
+
+def check_checkpoint(path, columns):
+    """Raise ValueError if an existing checkpoint file has a header other than columns.
+
+    Called before any work is done, so a stale checkpoint (e.g. written before
+    new metric columns were added) fails fast instead of after the first chunk.
+    """
+    if not path or not os.path.exists(path) or _complete_length(path) == 0:
+        return
+    with open(path, newline='') as f:
+        header = next(csv.reader(f), [])
+    if header != list(columns):
+        raise ValueError(f'{path} was written with other columns; use a new checkpoint file')
+
+
+def load_checkpoint(path, key_cols, columns):
+    """{key: row} for configs already finished in an append-only results file.
+
+    key is the tuple of key_cols values, row the tuple of columns values, all as
+    floats. A last line without its newline is a partial write and is ignored,
+    as are rows missing a column (e.g. from a run with other windows), so they
+    get recomputed.
+    """
+    done = {}
+    if not path or not os.path.exists(path):
+        return done
+    with open(path, newline='') as f:
+        text = f.read(_complete_length(path))
+    for rec in csv.DictReader(io.StringIO(text, newline='')):
+        try:
+            key = tuple(float(rec[c]) for c in key_cols)
+            row = tuple(float(rec[c]) for c in columns)
+        except (KeyError, TypeError, ValueError):
+            continue
+        done[key] = row
+    return done
+
+
+def append_checkpoint(path, columns, rows):
+    """Append finished rows to a results file, writing the header if it is new.
+
+    A partial last line left by an interrupted run is cut off first, so it is
+    recomputed instead of being read back as a finished row.
+    """
+    if os.path.exists(path):
+        keep = _complete_length(path)
+        if keep < os.path.getsize(path):
+            os.truncate(path, keep)
+    new = not os.path.exists(path) or os.path.getsize(path) == 0
+    check_checkpoint(path, columns)
+    with open(path, 'a', newline='') as f:
+        writer = csv.writer(f)
+        if new:
+            writer.writerow(columns)
+        writer.writerows(rows)
+
+
+def sweep_kernel(windows=OPT_WINDOWS, gate=None, chunk_size=512, checkpoint=None, base=None,
+                 cost_bps=None, **columns):
+    """Evaluate many configurations in batched array passes.
+
+    Keyword arguments are arrays (or scalars) for any sweep_columns() column:
+    SWEEP_PARAMS, ath_<asset> multipliers, indicator curves (e.g. CPI_c),
+    FRED publication lags (e.g. lag_CPI), yield_gate and allocation-line
+    coefficients (e.g. TLT_rs). Everything broadcasts to C configs, evaluated
+    chunk_size at a time to bound the (C, months, assets) tensor. Columns not
+    swept come from the StrategyParams base (default: module globals); a group
+    other than SWEEP_PARAMS and ATH multipliers only becomes part of the sweep,
+    with all its columns, when one of its columns is given.
+
+    With checkpoint, every finished chunk is appended to that CSV file and
+    configs already present in it are loaded instead of recomputed, so an
+    interrupted or extended sweep only evaluates what is missing. Inputs that
+    are not sweep columns (base, gate, cost_bps and the data files) are hashed
+    into the name of the header's last column, so a file written with other
+    inputs is rejected instead of supplying stale metrics.
+
+    Returns a DataFrame with one row per config: the sweep columns, then
+    sh/tr/dd columns per window (e.g. sh14, tr14, dd14), the yearly one-way
+    turnover (to14) and the same metrics net of trading costs at cost_bps
+    (default: COST_BPS; nsh14, ntr14, ndd14), and the optimizer score, which
+    stays on gross metrics.
+    """
+    data = _get_data()
+    if data is None:
+        print('ERROR: Missing data')
+        return None
+
+    cols = _sweep_param_arrays(base=base, **columns)
+    n = len(cols['intl_risk_power'])
+    years = data['signals'].index[:-1].year.to_numpy()
+
+    out = dict(cols)
+    key_cols = list(out)
+    metric_cols = [f'{k}{window_label(*w)}' for w in windows
+                   for k in ('sh', 'tr', 'dd', 'to', 'nsh', 'ntr', 'ndd')]
+    cost = cost_vector(cost_bps)
+    for c in metric_cols:
+        out[c] = np.empty(n)
+    inputs = 'inputs_' + ResultCache.key({
+        'version': RESULT_CACHE_VERSION,
+        'data': _data_fingerprint(),
+        'params': _resolve_params(base, gate=gate).to_dict(),
+        'cost': cost.tolist(),
+    })[:12]
+    header = key_cols + metric_cols + [inputs]
+
+    todo = np.arange(n)
+    if checkpoint:
+        check_checkpoint(checkpoint, header)
+        done = load_checkpoint(checkpoint, key_cols, metric_cols)
+        keys = list(zip(*(out[c] for c in key_cols)))
+        hit = np.array([k in done for k in keys], dtype=bool)
+        for i in np.flatnonzero(hit):
+            for c, v in zip(metric_cols, done[keys[i]]):
+                out[c][i] = v
+        todo = np.flatnonzero(~hit)
+        if hit.any():
+            print(f"Checkpoint {checkpoint}: {hit.sum():,} of {n:,} configs already done")
+
+    for lo in range(0, len(todo), chunk_size):
+        sel = todo[lo:lo + chunk_size]
+        chunk = {c: v[sel] for c, v in cols.items()}
+        rets, turnover, costs = _batch_returns(data, chunk, gate=gate, base=base, cost=cost)
+        stats = _window_stats(rets, years, windows)
+        net = _window_stats((1 + rets) * (1 - costs) - 1, years, windows)
+        turn = np.concatenate([np.zeros((len(sel), 1)), np.cumsum(turnover, axis=1)], axis=1)
+        for w in windows:
+            lab = window_label(*w)
+            for prefix, (sh, tr, dd) in (('', stats[w]), ('n', net[w])):
+                out[f'{prefix}sh{lab}'][sel] = sh
+                out[f'{prefix}tr{lab}'][sel] = tr
+                out[f'{prefix}dd{lab}'][sel] = dd
+            a = np.searchsorted(years, w[0], side='left')
+            b = np.searchsorted(years, w[1], side='right')
+            out[f'to{lab}'][sel] = (turn[:, b] - turn[:, a]) / max(b - a, 1) * 12
+        if checkpoint:
+            rows = zip(*(out[c][sel].tolist() for c in key_cols + metric_cols))
+            append_checkpoint(checkpoint, header, (row + ('',) for row in rows))
+
+    df = pd.DataFrame(out)
+    if all(w in windows for w in OPT_WINDOWS):
+        df['score'] = score_configs(df)
+    return df
+
+
+def sweep_grid(**axes):
+    """Cartesian product of parameter axes as flat arrays, for sweep_kernel()."""
+    names = list(axes)
+    mesh = np.meshgrid(*[np.asarray(axes[k], dtype=float) for k in names], indexing='ij')
+    return {k: g.ravel() for k, g in zip(names, mesh)}
+
+
+DENSE_SWEEP_AXES = {'intl_risk_power': np.linspace(0, 6, 25),
+                    'ewy_share': np.linspace(0, 1, 21),
+                    'intl_max_share': np.linspace(0.15, 0.60, 10),
+                    'sma_k': [30, 50, 70, 90, 120]}
+
+
+def run_sweep(top=20, checkpoint=None):
+    """Dense 4D sweep (power × EWY share × max share × SMA k) with the batched kernel."""
+    grid = sweep_grid(**DENSE_SWEEP_AXES)
+    n = len(grid['intl_risk_power'])
+    print(f"\n{'=' * 100}")
+    print(f"ST8 BATCHED SWEEP: {n:,} configs × {len(OPT_WINDOWS)} windows")
+    print(f"{'=' * 100}")
+    t0 = time.time()
+    df = sweep_kernel(checkpoint=checkpoint, **grid)
+    if df is None:
+        return None
+    print(f"Evaluated in {time.time() - t0:.1f}s")
+
+    print(f"\n{'Power':>6s} {'EWY_Sh':>7s} {'MaxSh':>6s} {'SMA_k':>6s} {'Sh14':>7s} {'DD14':>6s} {'Sh25':>7s} {'DD25':>6s} {'Sh60':>7s} {'DD60':>6s} {'Score':>7s}")
+    print('-' * 90)
+    for r in df.sort_values('score', ascending=False).head(top).itertuples():
+        print(f"{r.intl_risk_power:6.2f} {r.ewy_share:7.2f} {r.intl_max_share:6.2f} {r.sma_k:6.0f} "
+              f"{r.sh14:7.4f} {r.dd14*100:6.0f}% {r.sh25:7.4f} {r.dd25*100:6.0f}% "
+              f"{r.sh60:7.4f} {r.dd60*100:6.0f}% {r.score:7.4f}")
+    store_results(df, 'sweep')
+    return df
+
+
+
+def run_sma_sweep(periods=range(50, 301, 10), ks=(20, 30, 50, 70, 90, 120, 150)):
+    """SMA period × k sweep: best k and its metrics for every period."""
+    grid = sweep_grid(sma_period=list(periods), sma_k=list(ks))
+    t0 = time.time()
+    df = sweep_kernel(**grid)
+    if df is None:
+        return None
+    print(f"\n{'=' * 90}")
+    print(f"ST8 SMA SWEEP: {len(df)} configs (period × k) in {time.time() - t0:.1f}s")
+    print(f"{'=' * 90}")
+    print(f"{'Period':>6s} {'Best_k':>6s} {'Sh14':>7s} {'DD14':>6s} {'Sh25':>7s} {'DD25':>6s} {'Sh60':>7s} {'DD60':>6s} {'Score':>7s}")
+    print('-' * 70)
+    best = df.loc[df.groupby('sma_period')['score'].idxmax()]
+    for r in best.itertuples():
+        mark = ' *' if r.sma_period == SMA_PARAMS['period'] else ''
+        print(f"{r.sma_period:6.0f} {r.sma_k:6.0f} {r.sh14:7.4f} {r.dd14*100:6.0f}% {r.sh25:7.4f} {r.dd25*100:6.0f}% "
+              f"{r.sh60:7.4f} {r.dd60*100:6.0f}% {r.score:7.4f}{mark}")
+    top = df.loc[df['score'].idxmax()]
+    print(f"\nBest: period={top.sma_period:.0f}, k={top.sma_k:.0f}, score={top.score:.4f}  "
+          f"(* = current SMA_PARAMS period {SMA_PARAMS['period']})")
+    store_results(df, 'smasweep')
+    return df
+
+
+def print_sensitivity(df, axes, metric='score'):
+    """Marginal table: best and mean metric for every value of every swept axis."""
+    print(f"\n{'Param':>8s} {'Value':>7s} {'Best':>8s} {'Mean':>8s} {'Worst':>8s}")
+    print('-' * 44)
+    for col in axes:
+        g = df.groupby(col)[metric]
+        for val, best, mean, worst in zip(g.max().index, g.max(), g.mean(), g.min()):
+            print(f"{PARAM_LABELS.get(col, col):>8s} {val:7.2f} {best:8.4f} {mean:8.4f} {worst:8.4f}")
+        spread = g.max().max() - g.max().min()
+        print(f"{'':>8s} {'spread':>7s} {spread:8.4f}")
+
+
+def run_ath_sweep(top=15):
+    """Batch sweep of per-asset ATH multipliers × gate steepness over the drawdown matrix."""
+    axes = {'ath_SPY': [0, 4, 8, 10, 12, 14, 16, 20, 24],
+            'ath_DBC': [0, 1, 2, 3, 4, 6],
+            'ath_EWY': [0, 2, 5],
+            'gate_k': [10, 20, 30, 45, 60]}
+    t0 = time.time()
+    df = sweep_kernel(**sweep_grid(**axes))
+    if df is None:
+        return None
+    print(f"\n{'=' * 100}")
+    print(f"ST8 ATH SWEEP: {len(df)} configs (SPY × DBC × EWY multipliers × gate k) in {time.time() - t0:.1f}s")
+    print(f"{'=' * 100}")
+    print(f"{'SPY':>5s} {'DBC':>5s} {'EWY':>5s} {'Gate_k':>6s} {'Sh14':>7s} {'DD14':>6s} {'Sh25':>7s} {'DD25':>6s} {'Sh60':>7s} {'DD60':>6s} {'Score':>7s}")
+    print('-' * 80)
+    for r in df.sort_values('score', ascending=False).head(top).itertuples():
+        print(f"{r.ath_SPY:5.0f} {r.ath_DBC:5.1f} {r.ath_EWY:5.1f} {r.gate_k:6.0f} {r.sh14:7.4f} {r.dd14*100:6.0f}% "
+              f"{r.sh25:7.4f} {r.dd25*100:6.0f}% {r.sh60:7.4f} {r.dd60*100:6.0f}% {r.score:7.4f}")
+    print_sensitivity(df, list(axes))
+    cur = df[(df['ath_SPY'] == ATH_PARAMS['SPY']) & (df['ath_DBC'] == ATH_PARAMS['DBC']) &
+             (df['ath_EWY'] == ATH_PARAMS['EWY']) & (df['gate_k'] == ATH_GATE['k'])]
+    best = df.loc[df['score'].idxmax()]
+    print(f"\nBest: SPY={best.ath_SPY:.0f}, DBC={best.ath_DBC:.1f}, EWY={best.ath_EWY:.1f}, "
+          f"gate_k={best.gate_k:.0f}, score={best.score:.4f}"
+          + (f"  |  current params score={cur['score'].iloc[0]:.4f}" if len(cur) else ''))
+    store_results(df, 'athsweep')
+    return df
+
+def alloc_grid(n=20000, scale=0.25, seed=0, base=None):
+    """Random allocation matrices around base as sweep_kernel() columns.
+
+    Every non-zero ALLOC_COEFS entry is scaled by an independent uniform draw
+    in [1 - scale, 1 + scale]; zero entries stay zero so the structure of each
+    line is kept. Row 0 is base itself. Returns {alloc_column(): (n,) array}.
+    """
+    if base is None:
+        base = default_params()
+    rng = np.random.default_rng(seed)
+    out = {}
+    for sleeve, coefs in base.alloc_coefs.items():
+        for key, v in coefs.items():
+            draw = v * rng.uniform(1 - scale, 1 + scale, n)
+            draw[0] = v
+            out[alloc_column(sleeve, key)] = draw
+    return out
+
+
+def run_alloc_sweep(n=20000, scale=0.25, seed=0, top=20, checkpoint=None):
+    """Random re-fit of the allocation-line matrix with the batched kernel."""
+    base = default_params()
+    grid = alloc_grid(n, scale, seed, base)
+    t0 = time.time()
+    df = sweep_kernel(checkpoint=checkpoint, **grid)
+    if df is None:
+        return None
+    elapsed = time.time() - t0
+    free = [alloc_column(s, k) for s, c in base.alloc_coefs.items() for k, v in c.items() if v != 0]
+    print(f"\n{'=' * 140}")
+    print(f"ST8 ALLOCATION-LINE SWEEP: {n:,} matrices (±{scale:.0%} on {len(free)} non-zero coefficients) "
+          f"in {elapsed:.1f}s ({n / elapsed:,.0f} configs/s)")
+    print(f"{'=' * 140}")
+    print(''.join(f"{c:>12s}" for c in free) + f" {'Sh14':>7s} {'DD14':>6s} {'Sh25':>7s} {'DD25':>6s} {'Sh60':>7s} {'DD60':>6s} {'Score':>7s}")
+    print('-' * (12 * len(free) + 52))
+    rows = [df.iloc[0]] + [r for _, r in df.iloc[1:].sort_values('score', ascending=False).head(top).iterrows()]
+    for j, r in enumerate(rows):
+        print(''.join(f"{r[c]:12.3f}" for c in free)
+              + f" {r.sh14:7.4f} {r.dd14*100:5.0f}% {r.sh25:7.4f} {r.dd25*100:5.0f}% "
+              f"{r.sh60:7.4f} {r.dd60*100:5.0f}% {r.score:7.4f}" + ('  (current ALLOC_COEFS)' if j == 0 else ''))
+    store_results(df, 'allocsweep')
+    return df
+
+
+# Perturbation per INDICATORS field: relative for centers and slopes, absolute for weights
+SENSITIVITY_STEPS = {'c': 0.10, 'k': 0.25, 'w': 0.05}
+
+
+def indicator_sensitivity(steps=None, windows=OPT_WINDOWS, base=None):
+    """Partial effect of every INDICATORS c, k and w on Sharpe and drawdown.
+
+    Each parameter is moved one step down and one step up with everything else
+    at base; the base config and all perturbations are scored in one
+    sweep_kernel batch. Weights are floored at 0. Returns one row per parameter
+    with its base, lo and hi values and the Sharpe/drawdown/score deltas
+    (d<metric>_lo, d<metric>_hi) versus base, most influential first.
+    """
+    steps = {**SENSITIVITY_STEPS, **(steps or {})}
+    if base is None:
+        base = default_params()
+    specs = []
+    for name, c, k, w in base.indicators:
+        for key, v in (('c', c), ('k', k), ('w', w)):
+            delta = steps[key] if key == 'w' else steps[key] * abs(v) or steps[key]
+            lo = max(0.0, v - delta) if key == 'w' else v - delta
+            specs.append((name, key, v, lo, v + delta))
+
+    n = 1 + 2 * len(specs)
+    grid = {indicator_column(name, key): np.full(n, v)
+            for name, c, k, w in base.indicators for key, v in zip('ckw', (c, k, w))}
+    for j, (name, key, v, lo, hi) in enumerate(specs):
+        grid[indicator_column(name, key)][1 + 2 * j] = lo
+        grid[indicator_column(name, key)][2 + 2 * j] = hi
+    df = sweep_kernel(windows=windows, base=base, **grid)
+    if df is None:
+        return None
+
+    metrics = [f'{k}{window_label(*w)}' for w in windows for k in ('sh', 'dd')]
+    if 'score' in df:
+        metrics.append('score')
+    ref = df.iloc[0]
+    rows = []
+    for j, (name, key, v, lo, hi) in enumerate(specs):
+        row = {'param': indicator_column(name, key), 'base': v, 'lo': lo, 'hi': hi}
+        for col in metrics:
+            row[f'd{col}_lo'] = df[col].iloc[1 + 2 * j] - ref[col]
+            row[f'd{col}_hi'] = df[col].iloc[2 + 2 * j] - ref[col]
+        rows.append(row)
+    out = pd.DataFrame(rows)
+    sh_cols = [c for c in out if c.startswith('dsh')]
+    out['max_dsh'] = out[sh_cols].abs().max(axis=1)
+    out = out.sort_values('max_dsh', ascending=False).reset_index(drop=True)
+    out.attrs['base'] = {col: float(ref[col]) for col in metrics}
+    return out
+
+
+def run_indicator_sensitivity():
+    """Print the ranked INDICATORS sensitivity table."""
+    t0 = time.time()
+    df = indicator_sensitivity()
+    if df is None:
+        return None
+    labs = [window_label(*w) for w in OPT_WINDOWS]
+    print(f"\n{'=' * 118}")
+    print(f"ST8 INDICATOR SENSITIVITY: {len(df)} params × 2 perturbations in {time.time() - t0:.2f}s "
+          f"(c, k ±{SENSITIVITY_STEPS['c']:.0%}/±{SENSITIVITY_STEPS['k']:.0%}, w ±{SENSITIVITY_STEPS['w']})")
+    print(f"{'=' * 118}")
+    b = df.attrs['base']
+    print("Base: " + '  '.join(f"Sh{l}={b[f'sh{l}']:.4f} DD{l}={b[f'dd{l}']*100:.0f}%" for l in labs)
+          + f"  Score={b['score']:.4f}")
+    print("Deltas vs base for the down / up perturbation (Sharpe ×1000, drawdown in pp)\n")
+    head = f"{'Param':>16s} {'Base':>6s} {'Lo':>6s} {'Hi':>6s}"
+    for l in labs:
+        head += f" {'dSh' + l:>11s} {'dDD' + l:>11s}"
+    print(head + f" {'dScore':>11s}")
+    print('-' * 118)
+    for r in df.to_dict('records'):
+        line = f"{r['param']:>16s} {r['base']:6.2f} {r['lo']:6.2f} {r['hi']:6.2f}"
+        for l in labs:
+            line += (f" {r[f'dsh{l}_lo']*1000:+5.0f}/{r[f'dsh{l}_hi']*1000:+5.0f}"
+                     f" {r[f'ddd{l}_lo']*100:+5.1f}/{r[f'ddd{l}_hi']*100:+5.1f}")
+        print(line + f" {r['dscore_lo']*1000:+5.0f}/{r['dscore_hi']*1000:+5.0f}")
+    return df
+
+
+def indicator_ablation(windows=OPT_WINDOWS, base=None):
+    """Every subset of INDICATORS, with and without the yield-inversion switch, in one batch.
+
+    An indicator is dropped by zeroing its weight, so the risk score is
+    renormalized over the weights left; indicators already at zero weight
+    cannot be ablated and stay off. The switch only acts on UNRATE and is
+    varied only for subsets that keep it; the empty subset (no risk score) is
+    skipped. Returns the sweep frame led by one 0/1 column per indicator name
+    plus yield_gate, best score first.
+    """
+    if base is None:
+        base = default_params()
+    names = [n for n, _, _, _ in base.indicators]
+    weights = np.array([w for _, _, _, w in base.indicators], dtype=float)
+    rows = []
+    for mask in itertools.product((1, 0), repeat=len(names)):
+        if np.dot(mask, weights) <= 0 or any(on and w == 0 for on, w in zip(mask, weights)):
+            continue
+        for gate in ((1, 0) if mask[names.index('UNRATE')] else (1,)):
+            rows.append(mask + (gate,))
+    flags = np.array(rows, dtype=float)
+    grid = {indicator_column(n, 'w'): flags[:, j] * weights[j] for j, n in enumerate(names)}
+    df = sweep_kernel(windows=windows, base=base, yield_gate=flags[:, -1], **grid)
+    if df is None:
+        return None
+    for j, n in enumerate(names):
+        df.insert(j, n, flags[:, j].astype(int))
+    rank = 'score' if 'score' in df else f'sh{window_label(*windows[0])}'
+    return df.sort_values(rank, ascending=False, kind='stable').reset_index(drop=True)
+
+
+def ablation_effects(df, flags, metric='score'):
+    """Mean change in metric from adding each of the 0/1 flags columns, over rows that differ only in it."""
+    effects = {}
+    for col in flags:
+        rest = [c for c in flags if c != col]
+        pairs = df[df[col] == 1].merge(df[df[col] == 0], on=rest, suffixes=('_on', '_off'))
+        effects[col] = (float((pairs[f'{metric}_on'] - pairs[f'{metric}_off']).mean()), len(pairs))
+    return effects
+
+
+def run_ablation(top=None):
+    """Ranked table of every INDICATORS subset × yield-inversion switch."""
+    t0 = time.time()
+    df = indicator_ablation()
+    if df is None:
+        return None
+    elapsed = time.time() - t0
+    names = list(INDICATORS)
+    labs = [window_label(*w) for w in OPT_WINDOWS]
+    print(f"\n{'=' * 100}")
+    print(f"ST8 INDICATOR ABLATION: {len(df)} subsets × yield switch in {elapsed:.2f}s "
+          f"(x = included, weights as in INDICATORS)")
+    print(f"{'=' * 100}")
+    short = {n: n[:6] for n in names}
+    head = ''.join(f"{short[n]:>7s}" for n in names) + f"{'YInv':>5s}"
+    for l in labs:
+        head += f" {'Sh' + l:>7s} {'DD' + l:>6s}"
+    print(head + f" {'Score':>7s}")
+    print('-' * (7 * len(names) + 5 + 15 * len(labs) + 8))
+    current = {n: int(INDICATORS[n]['w'] > 0) for n in names}
+    for r in (df if top is None else df.head(top)).to_dict('records'):
+        line = ''.join(f"{'x' if r[n] else '.':>7s}" for n in names)
+        line += f"{'x' if r['yield_gate'] else '.':>5s}"
+        for l in labs:
+            line += f" {r[f'sh{l}']:7.4f} {r[f'dd{l}'] * 100:5.0f}%"
+        mark = ' *' if all(r[n] == v for n, v in current.items()) and r['yield_gate'] else ''
+        print(line + f" {r['score']:7.4f}{mark}")
+    print("(* = current strategy)")
+
+    flags = [n for n in names if INDICATORS[n]['w'] > 0] + ['yield_gate']
+    print("\nMean score change from including each input (paired subsets)")
+    for col, (d, n) in ablation_effects(df, flags).items():
+        print(f"  {col:>14s} {d:+8.4f}  over {n} pairs")
+    idle = [n for n in names if INDICATORS[n]['w'] == 0]
+    if idle:
+        print(f"  {', '.join(idle)}: zero weight in INDICATORS, not ablated")
+    store_results(df, 'ablation')
+    return df
+
+
+LAG_SWEEP_DAYS = range(0, 91, 5)
+
+
+def lag_sensitivity(lags=LAG_SWEEP_DAYS, windows=OPT_WINDOWS, base=None):
+    """Strategy metrics versus the assumed FRED publication lag.
+
+    Every series is swept over lags on its own with the others at
+    FRED_LAG_DAYS, then all series together; the whole set is one
+    sweep_kernel batch over macro inputs re-derived from the raw FRED data.
+    Returns the sweep frame with a 'series' column (a FRED_FILES name or 'all')
+    and a 'lag' column.
+    """
+    lags = np.asarray(list(lags), dtype=float)
+    names = [n for n, _ in FRED_FILES]
+    groups = names + ['all']
+    grid = {lag_column(n): np.full(len(groups) * len(lags), float(FRED_LAG_DAYS)) for n in names}
+    for g, group in enumerate(groups):
+        for n in names:
+            if group in (n, 'all'):
+                grid[lag_column(n)][g * len(lags):(g + 1) * len(lags)] = lags
+    df = sweep_kernel(windows=windows, base=base, **grid)
+    if df is None:
+        return None
+    df.insert(0, 'series', np.repeat(groups, len(lags)))
+    df.insert(1, 'lag', np.tile(lags, len(groups)))
+    return df
+
+
+def run_lag_sweep(lags=LAG_SWEEP_DAYS):
+    """Print score versus publication lag per FRED series and the spread of each."""
+    t0 = time.time()
+    df = lag_sensitivity(lags)
+    if df is None:
+        return None
+    groups = list(dict.fromkeys(df['series']))
+    labs = [window_label(*w) for w in OPT_WINDOWS]
+    print(f"\n{'=' * 80}")
+    print(f"ST8 PUBLICATION-LAG SWEEP: {len(df)} configs (lag × series) in {time.time() - t0:.2f}s "
+          f"(current lag {FRED_LAG_DAYS}d)")
+    print(f"{'=' * 80}")
+    score = df.pivot(index='lag', columns='series', values='score')[groups]
+    print(f"Score by lag (days)\n{'Lag':>5s}" + ''.join(f" {g:>9s}" for g in groups))
+    print('-' * (6 + 10 * len(groups)))
+    for lag, row in score.iterrows():
+        mark = ' *' if lag == FRED_LAG_DAYS else ''
+        print(f"{lag:5.0f}" + ''.join(f" {v:9.4f}" for v in row) + mark)
+
+    print(f"\nRange over lags {df['lag'].min():.0f}-{df['lag'].max():.0f}d (max - min)")
+    print(f"{'Series':>9s}" + ''.join(f" {'Sh' + l:>7s} {'DD' + l:>6s}" for l in labs) + f" {'Score':>7s}")
+    print('-' * (10 + 15 * len(labs) + 8))
+    for g in groups:
+        sub = df[df['series'] == g]
+        line = f"{g:>9s}"
+        for l in labs:
+            line += f" {np.ptp(sub[f'sh{l}']):7.4f} {np.ptp(sub[f'dd{l}']) * 100:5.1f}%"
+        print(line + f" {np.ptp(sub['score']):7.4f}")
+    store_results(df.drop(columns='series'), 'lagsweep')
+    return df
+
+
+# ── Pareto frontier ───────────────────────────────────────
+
+def _dominates(a, b):
+    """Elementwise over leading axes: a >= b on every objective and a > b on at least one."""
+    return (a >= b).all(axis=-1) & (a > b).any(axis=-1)
+
+
+def pareto_front(objectives, block=1024):
+    """Boolean mask of the non-dominated rows of objectives (N, d), all maximized.
+
+    Rows are sorted lexicographically in descending order, after which a row can
+    only be dominated by rows before it. Sorted rows are then culled block by
+    block: against the frontier found so far in one broadcast comparison, and
+    within the block through its lower-triangular dominance matrix. Cost is
+    O(N·F) for a frontier of F rows, with no Python loop over rows. A row is
+    dominated by one at least as good everywhere and better somewhere, so
+    rows with identical objectives are all kept.
+    """
+    obj = np.asarray(objectives, dtype=float)
+    n, d = obj.shape
+    order = np.lexsort(-obj.T[::-1])
+    mask = np.zeros(n, dtype=bool)
+    front = np.empty((0, d))
+    for lo in range(0, n, block):
+        idx = order[lo:lo + block]
+        blk = obj[idx]
+        alive = ~_dominates(front[None, :, :], blk[:, None, :]).any(axis=1)
+        idx, blk = idx[alive], blk[alive]
+        dom = _dominates(blk[None, :, :], blk[:, None, :])   # dom[i, j]: row j dominates row i
+        alive = ~np.tril(dom, k=-1).any(axis=1)
+        mask[idx[alive]] = True
+        front = np.concatenate([front, blk[alive]])
+    return mask
+
+
+def pareto_objectives(df, windows=OPT_WINDOWS):
+    """Frontier objectives per config: mean Sharpe, mean CAGR and worst drawdown over windows."""
+    sharpe = sum(df[f'sh{window_label(*w)}'] for w in windows) / len(windows)
+    cagr = sum((1 + df[f'tr{window_label(*w)}']) ** (1 / (w[1] - w[0] + 1)) - 1
+               for w in windows) / len(windows)
+    max_dd = pd.concat([df[f'dd{window_label(*w)}'] for w in windows], axis=1).min(axis=1)
+    return pd.DataFrame({'sharpe': sharpe, 'cagr': cagr, 'max_dd': max_dd})
+
+
+def pareto_frontier(df, windows=OPT_WINDOWS):
+    """Non-dominated rows of a sweep_kernel result, with objective columns added.
+
+    Every config is kept in the input; the frontier maximizes mean Sharpe and
+    mean CAGR and minimizes the worst drawdown (i.e. maximizes max_dd, which is
+    negative) across windows. Returns the frontier sorted by Sharpe.
+    """
+    obj = pareto_objectives(df, windows)
+    full = pd.concat([df, obj], axis=1)
+    ok = obj.notna().all(axis=1).to_numpy()
+    mask = np.zeros(len(df), dtype=bool)
+    mask[ok] = pareto_front(obj.to_numpy()[ok])
+    return full[mask].sort_values('sharpe', ascending=False)
+
+
+def plot_pareto(df, front, path=None, current=None):
+    """Scatter of all configs (worst drawdown vs mean Sharpe, colored by CAGR) with the frontier."""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    if path is None:
+        os.makedirs(PLOTS_DIR, exist_ok=True)
+        path = os.path.join(PLOTS_DIR, 'pareto_frontier.png')
+    fig, ax = plt.subplots(figsize=(10, 6))
+    ax.scatter(df['max_dd'] * 100, df['sharpe'], s=3, color='#CBD5E1', alpha=0.5, label='All configs')
+    sc = ax.scatter(front['max_dd'] * 100, front['sharpe'], c=front['cagr'] * 100, s=18,
+                    cmap='viridis', edgecolors='black', linewidths=0.3, zorder=3, label='Frontier')
+    fig.colorbar(sc, ax=ax, label='Mean CAGR (%)')
+    if current is not None:
+        ax.scatter([current['max_dd'] * 100], [current['sharpe']], marker='*', s=200,
+                   color='#DC2626', zorder=4, label='Current params')
+    ax.set_xlabel('Worst max drawdown across windows (%)')
+    ax.set_ylabel('Mean Sharpe across windows')
+    ax.set_title(f'ST8 Pareto Frontier ({len(front)} of {len(df):,} configs)')
+    ax.legend(loc='lower left', fontsize=9)
+    ax.grid(True, alpha=0.3)
+    fig.tight_layout()
+    fig.savefig(path, dpi=120)
+    plt.close(fig)
+    return path
+
+
+def run_pareto(top=40, checkpoint=None):
+    """Dense sweep → non-dominated frontier over Sharpe, CAGR and drawdown → table and plot."""
+    grid = sweep_grid(**DENSE_SWEEP_AXES)
+    t0 = time.time()
+    df = sweep_kernel(checkpoint=checkpoint, **grid)
+    if df is None:
+        return None
+    t1 = time.time()
+    front = pareto_frontier(df)
+    t2 = time.time()
+    full = pd.concat([df, pareto_objectives(df)], axis=1)
+    base = default_params()
+    ref = sweep_kernel()
+    cur = pd.concat([ref, pareto_objectives(ref)], axis=1).iloc[0]
+
+    print(f"\n{'=' * 100}")
+    print(f"ST8 PARETO FRONTIER: {len(front)} non-dominated of {len(df):,} configs "
+          f"(sweep {t1 - t0:.1f}s, sort {t2 - t1:.2f}s)")
+    print("Objectives: mean Sharpe ↑, mean CAGR ↑, worst drawdown ↓ over "
+          + ', '.join(f'{sy}-{ey}' for sy, ey in OPT_WINDOWS))
+    print(f"{'=' * 100}")
+    print(f"{'Power':>6s} {'EWY_Sh':>7s} {'MaxSh':>6s} {'SMA_k':>6s} {'Sharpe':>7s} {'CAGR':>6s} {'WorstDD':>8s} "
+          f"{'Sh14':>7s} {'Sh25':>7s} {'Sh60':>7s} {'Score':>7s}")
+    print('-' * 90)
+    shown = front if len(front) <= top else front.iloc[np.linspace(0, len(front) - 1, top).round().astype(int)]
+    for r in shown.itertuples():
+        print(f"{r.intl_risk_power:6.2f} {r.ewy_share:7.2f} {r.intl_max_share:6.2f} {r.sma_k:6.0f} "
+              f"{r.sharpe:7.4f} {r.cagr*100:5.1f}% {r.max_dd*100:7.1f}% "
+              f"{r.sh14:7.4f} {r.sh25:7.4f} {r.sh60:7.4f} {r.score:7.4f}")
+    if len(front) > top:
+        print(f"  ({top} of {len(front)} frontier configs shown, evenly spaced by Sharpe)")
+    print(f"\nCurrent params (power={base.intl_risk_power}, EWY={base.ewy_share}, "
+          f"max_share={base.intl_max_share}, SMA_k={base.sma_k:.0f}): Sharpe={cur['sharpe']:.4f}, "
+          f"CAGR={cur['cagr']*100:.1f}%, worst DD={cur['max_dd']*100:.1f}%")
+    path = plot_pareto(full, front, current=cur)
+    print(f"Plot: {path}")
+    store_results(df, 'pareto')
+    return front
+
+
 # ── Optimizer ─────────────────────────────────────────────
 
-def optimize_risk_power():
-    """Grid search over INTL_RISK_POWER, EWY_SHARE, and INTL_MAX_SHARE."""
+def _evaluate_config(cfg):
+    """Optimizer row for one (power, ewy_share, max_share) config, or None if a window fails."""
+    power, ew, ms = cfg
+    res = backtest_windows(OPT_WINDOWS, intl_risk_power=power, ewy_share=ew,
+                           intl_max_share=ms, verbose=False)
+    if res is None:
+        return None
+    r14, r25, r60 = (res[w] for w in OPT_WINDOWS)
+    if r14 is None or r25 is None or r60 is None:
+        return None
+
+    sh14, tr14, dd14 = r14
+    sh25, tr25, dd25 = r25
+    sh60, tr60, dd60 = r60
+
+    score = (sh14 + sh25 + sh60) / 3
+    if any(r[2] < OPT_DD_LIMITS[w] for w, r in zip(OPT_WINDOWS, (r14, r25, r60))):
+        score *= 0.5
+
+    return (power, ew, ms, sh14, tr14, dd14, sh25, tr25, dd25, sh60, tr60, dd60, score)
+
+
+def _init_worker():
+    """Pool initializer: load the monthly data once per worker process."""
+    _get_data()
+
+
+def _pool_map(func, items, workers=1):
+    """Yield func(item) in order, serially or over a process pool that loads data once per worker."""
+    if workers <= 1:
+        yield from map(func, items)
+        return
+    with multiprocessing.Pool(workers, initializer=_init_worker) as pool:
+        chunksize = max(1, len(items) // (workers * 4))
+        yield from pool.imap(func, items, chunksize=chunksize)
+
+
+def _map_configs(configs, workers=1):
+    """Yield _evaluate_config results in config order, serially or over a process pool."""
+    return _pool_map(_evaluate_config, configs, workers)
+
+
+# Assumed ceiling on any single window's Sharpe, used to bound the score of a
+# partly evaluated config. A heuristic, not a proven bound: the best window
+# Sharpe in the dense sweep is ~1.2, but a window above the cap could get the
+# true best config pruned. Override with optimize --prune-cap.
+PRUNE_SHARPE_CAP = 1.5
+
+
+def _evaluate_config_pruned(cfg, best_score, hard_dd=False, block=24, sharpe_cap=PRUNE_SHARPE_CAP):
+    """_evaluate_config with early termination.
+
+    OPT_WINDOWS are nested and share an end year, so months are evaluated
+    backwards from the end in blocks of block months: the shortest window
+    completes first, then each longer one extends it. After every block the
+    drawdown of the evaluated suffix is checked; a window's drawdown can only
+    be worse, so a breach of OPT_DD_LIMITS is known for certain as soon as the
+    suffix breaches. The score is bounded by the finished windows' Sharpe
+    plus PRUNE_SHARPE_CAP for unfinished ones, halved once a breach is
+    certain, and the config is abandoned when that bound cannot beat
+    best_score. The bound assumes no unfinished window exceeds sharpe_cap
+    (default PRUNE_SHARPE_CAP), so pruning is only exact while that holds.
+    With hard_dd a certain breach rejects the config outright.
+
+    Returns (row, months, reason): row as _evaluate_config (None if abandoned),
+    the number of months evaluated, and why it was abandoned ('bound',
+    'dd <window>', 'no data') or None.
+    """
+    power, ew, ms = cfg
+    p = default_params().replace(intl_risk_power=power, ewy_share=ew, intl_max_share=ms)
+    data = _get_data()
+    years = data['signals'].index[:-1].year.to_numpy()
+    wins = sorted(OPT_WINDOWS, key=lambda w: -w[0])
+    end = np.searchsorted(years, wins[0][1], side='right')
+    if any(w[1] != wins[0][1] for w in wins):
+        raise ValueError('pruned evaluation needs OPT_WINDOWS sharing one end year')
+
+    lo, rets, metrics, breached = end, np.empty(0), {}, set()
+
+    def bound():
+        known = sum(r[0] for r in metrics.values())
+        score = (known + sharpe_cap * (len(wins) - len(metrics))) / len(wins)
+        return score * 0.5 if breached else score
+
+    for win in wins:
+        start = np.searchsorted(years, win[0], side='left')
+        while lo > start:
+            new_lo = max(start, lo - block)
+            _, _, _, r, _ = _vector_returns(data, p, rows=slice(new_lo, lo))
+            rets, lo = np.concatenate([r, rets]), new_lo
+            valid = rets[~np.isnan(rets)]
+            if len(valid):
+                cum = np.cumprod(1 + valid)
+                dd = (cum / np.maximum.accumulate(cum) - 1).min()
+                # Every window still open contains the evaluated suffix
+                for w in wins:
+                    if w not in metrics and dd < OPT_DD_LIMITS.get(w, -np.inf) and w not in breached:
+                        breached.add(w)
+                        if hard_dd:
+                            return None, end - lo, f'dd {window_label(*w)}'
+            if bound() <= best_score:
+                return None, end - lo, 'bound'
+
+        valid = rets[~np.isnan(rets)]
+        if len(valid) == 0 or np.std(valid) == 0:
+            return None, end - lo, 'no data'
+        cum = np.cumprod(1 + valid)
+        metrics[win] = (float(np.mean(valid) / np.std(valid) * np.sqrt(12)), float(cum[-1] - 1),
+                        float((cum / np.maximum.accumulate(cum) - 1).min()))
+        if metrics[win][2] < OPT_DD_LIMITS.get(win, -np.inf):
+            breached.add(win)
+        if bound() <= best_score:
+            return None, end - lo, 'bound'
+
+    flat = [x for w in OPT_WINDOWS for x in metrics[w]]
+    return (power, ew, ms, *flat, _partial_score(metrics)), end - lo, None
+
+
+OPT_COLUMNS = ['intl_risk_power', 'ewy_share', 'intl_max_share',
+               'sh14', 'tr14', 'dd14', 'sh25', 'tr25', 'dd25', 'sh60', 'tr60', 'dd60', 'score']
+
+
+def optimize_risk_power(workers=1, checkpoint=None, prune=False, hard_dd=False,
+                        prune_cap=PRUNE_SHARPE_CAP):
+    """Grid search over INTL_RISK_POWER, EWY_SHARE, and INTL_MAX_SHARE.
+
+    With workers > 1 the configs are spread over a process pool; results are
+    consumed in grid order, so the printed table and best config are identical
+    to the serial run. With checkpoint, each finished config is appended to
+    that CSV file and configs already in it are not re-evaluated.
+
+    With prune, configs are evaluated serially by _evaluate_config_pruned and
+    abandoned once they cannot beat the best score so far (or, with hard_dd,
+    once they certainly breach a drawdown limit). This is a heuristic: the
+    best config matches the unpruned run only if no unfinished window's
+    Sharpe exceeds prune_cap. The skip rate is reported at the end, and the
+    surviving rows are stored under source 'optimize-pruned' so they never
+    pass for a full grid.
+    """
     print(f"\n{'=' * 120}")
     print("ST8 3D OPTIMIZATION: INTL_RISK_POWER × EWY_SHARE × INTL_MAX_SHARE")
     print(f"{'=' * 120}")
@@ -351,40 +2253,66 @@ def optimize_risk_power():
     powers = [0, 0.5, 1.0, 1.5, 2.0, 2.5, 3.0, 4.0, 5.0]
     ewys = [0.0, 0.25, 0.5, 0.75, 1.0]
     max_shares = [0.25, 0.35, 0.50]
+    configs = [(power, ew, ms) for ms in max_shares for power in powers for ew in ewys]
+
+    check_checkpoint(checkpoint, OPT_COLUMNS)
+    done = load_checkpoint(checkpoint, OPT_COLUMNS[:3], OPT_COLUMNS) if checkpoint else {}
+    if done:
+        print(f"Checkpoint {checkpoint}: {sum(c in done for c in configs)} of {len(configs)} configs already done")
+    if prune:
+        if workers > 1:
+            print("Pruning needs the running best score; evaluating serially")
+        data = _get_data()
+        years = data['signals'].index[:-1].year.to_numpy()
+        full_months = int(((years >= min(w[0] for w in OPT_WINDOWS)) &
+                           (years <= max(w[1] for w in OPT_WINDOWS))).sum())
+        skipped = {}
+        months_done = 0
+    else:
+        fresh = _map_configs([c for c in configs if c not in done], workers)
+
+    def results():
+        nonlocal months_done
+        for cfg in configs:
+            if cfg in done:
+                yield cfg, done[cfg]
+                continue
+            if prune:
+                row, months, reason = _evaluate_config_pruned(cfg, best_score, hard_dd=hard_dd,
+                                                              sharpe_cap=prune_cap)
+                months_done += months
+                if reason is not None:
+                    skipped[cfg] = (reason, months)
+            else:
+                row = next(fresh)
+            if row is not None and checkpoint:
+                append_checkpoint(checkpoint, OPT_COLUMNS, [row])
+            yield cfg, row
 
     best_score = 0
     best_config = None
     all_results = []
 
-    for ms in max_shares:
-        print(f"\n--- INTL_MAX_SHARE = {ms:.2f} ---")
-        print(f"{'Power':>6s} {'EWY_Sh':>7s} {'Sh14':>7s} {'Ret14':>8s} {'DD14':>6s} {'Sh25':>7s} {'Ret25':>8s} {'DD25':>6s} {'Sh60':>7s} {'Ret60':>8s} {'DD60':>6s} {'Score':>7s}")
-        print('-' * 100)
-        for power in powers:
-            for ew in ewys:
-                r14 = backtest(2011, 2024, intl_risk_power=power, ewy_share=ew,
-                               intl_max_share=ms, verbose=False)
-                r25 = backtest(2000, 2024, intl_risk_power=power, ewy_share=ew,
-                               intl_max_share=ms, verbose=False)
-                r60 = backtest(1965, 2024, intl_risk_power=power, ewy_share=ew,
-                               intl_max_share=ms, verbose=False)
-                if r14 is None or r25 is None or r60 is None:
-                    continue
-
-                sh14, tr14, dd14 = r14
-                sh25, tr25, dd25 = r25
-                sh60, tr60, dd60 = r60
-
-                score = (sh14 + sh25 + sh60) / 3
-                if dd14 < -0.20 or dd25 < -0.25 or dd60 < -0.25:
-                    score *= 0.5
-
-                all_results.append((power, ew, ms, sh14, tr14, dd14, sh25, tr25, dd25, sh60, tr60, dd60, score))
-                print(f"{power:6.1f} {ew:7.2f} {sh14:7.4f} {tr14*100:+8.1f}% {dd14*100:6.0f}% {sh25:7.4f} {tr25*100:+8.1f}% {dd25*100:6.0f}% {sh60:7.4f} {tr60*100:+8.1f}% {dd60*100:6.0f}% {score:7.4f}")
-
-                if score > best_score:
-                    best_score = score
-                    best_config = (power, ew, ms, sh14, tr14, dd14, sh25, tr25, dd25, sh60, tr60, dd60)
+    current_ms = None
+    for cfg, row in results():
+        if cfg[2] != current_ms:
+            current_ms = cfg[2]
+            print(f"\n--- INTL_MAX_SHARE = {current_ms:.2f} ---")
+            print(f"{'Power':>6s} {'EWY_Sh':>7s} {'Sh14':>7s} {'Ret14':>8s} {'DD14':>6s} {'Sh25':>7s} {'Ret25':>8s} {'DD25':>6s} {'Sh60':>7s} {'Ret60':>8s} {'DD60':>6s} {'Score':>7s}")
+            print('-' * 100)
+        if row is None:
+            if prune and cfg in skipped:
+                reason, months = skipped[cfg]
+                print(f"{cfg[0]:6.1f} {cfg[1]:7.2f}   pruned after {months} months ({reason})")
+            continue
+
+        power, ew, ms, sh14, tr14, dd14, sh25, tr25, dd25, sh60, tr60, dd60, score = row
+        all_results.append(row)
+        print(f"{power:6.1f} {ew:7.2f} {sh14:7.4f} {tr14*100:+8.1f}% {dd14*100:6.0f}% {sh25:7.4f} {tr25*100:+8.1f}% {dd25*100:6.0f}% {sh60:7.4f} {tr60*100:+8.1f}% {dd60*100:6.0f}% {score:7.4f}")
+
+        if score > best_score:
+            best_score = score
+            best_config = row[:-1]
 
     if best_config:
         print(f"\n{'=' * 120}")
@@ -393,13 +2321,611 @@ def optimize_risk_power():
         print(f"  25yr: Sharpe={best_config[6]:.4f}, Ret={best_config[7]*100:+.1f}%, DD={best_config[8]*100:.0f}%")
         print(f"  60yr: Sharpe={best_config[9]:.4f}, Ret={best_config[10]*100:+.1f}%, DD={best_config[11]*100:.0f}%")
 
+    if prune:
+        n_eval = len(configs) - len(done)
+        by_reason = {}
+        for reason, _ in skipped.values():
+            by_reason[reason] = by_reason.get(reason, 0) + 1
+        print(f"\nPruning (Sharpe cap {prune_cap:g}): {len(skipped)} of {n_eval} configs abandoned "
+              f"({len(skipped) / max(n_eval, 1):.0%}; "
+              + ', '.join(f'{k}: {v}' for k, v in sorted(by_reason.items())) + ')')
+        print(f"  Months evaluated: {months_done:,} of {n_eval * full_months:,} "
+              f"({1 - months_done / max(n_eval * full_months, 1):.0%} skipped)")
+
+    if all_results:
+        store_results(pd.DataFrame(all_results, columns=OPT_COLUMNS), 'optimize-pruned' if prune else 'optimize')
     return all_results
 
 
+# Continuous ranges explored by adaptive_search()
+SEARCH_RANGES = {'intl_risk_power': (0.0, 6.0), 'ewy_share': (0.0, 1.0),
+                 'intl_max_share': (0.15, 0.60)}
+
+
+def _partial_score(metrics):
+    """Optimizer objective over whichever OPT_WINDOWS have been evaluated so far."""
+    if not metrics or any(r is None for r in metrics.values()):
+        return -np.inf
+    score = sum(r[0] for r in metrics.values()) / len(metrics)
+    if any(r[2] < OPT_DD_LIMITS.get(w, -np.inf) for w, r in metrics.items()):
+        score *= 0.5
+    return score
+
+
+def _window_backtest(data, p, win):
+    """(sharpe, total_return, max_drawdown) of one window, computing only its rows.
+
+    Returns (metrics or None, number of month rows evaluated).
+    """
+    years = data['signals'].index[:-1].year
+    a, b = np.searchsorted(years, win[0], side='left'), np.searchsorted(years, win[1], side='right')
+    if b <= a:
+        return None, 0
+    prev_idx, _, _, ret, _ = _vector_returns(data, p, rows=slice(a, b))
+    keep = ~np.isnan(ret)
+    sh, tr, dd = _window_stats(ret[keep][None, :], prev_idx.year.to_numpy()[keep], [win])[win]
+    if np.isnan(sh[0]):
+        return None, b - a
+    return (float(sh[0]), float(tr[0]), float(dd[0])), b - a
+
+
+def adaptive_search(budget=120, seed=0, eta=3, ranges=None, verbose=True):
+    """Successive-halving + local refinement over continuous parameter ranges.
+
+    The budget is a maximum number of single-window backtests, each computed
+    over that window's months only (see _window_backtest), so short windows
+    really are cheaper; 'passes' reports the work done in full-history
+    backtest equivalents. Roughly half the budget goes to successive halving:
+    random configs are scored on the 14yr window, the best 1/eta also get the
+    25yr window, and the best of those the 60yr window. The rest is spent on
+    Gaussian perturbations around the incumbent, scored on all three windows,
+    with the step shrinking when a round fails to improve.
+    """
+    if ranges is None:
+        ranges = SEARCH_RANGES
+    rungs = sorted(OPT_WINDOWS, key=lambda w: w[1] - w[0])
+    minimum = sum(max(1, eta ** (len(rungs) - 1) // eta ** i) for i in range(len(rungs)))
+    if budget < minimum:
+        print(f'ERROR: budget must be at least {minimum} backtests for {len(rungs)} halving rungs')
+        return None
+    data = _get_data()
+    if data is None:
+        print('ERROR: Missing data')
+        return None
+    rng = np.random.default_rng(seed)
+    names = list(ranges)
+    lo = np.array([ranges[k][0] for k in names])
+    hi = np.array([ranges[k][1] for k in names])
+    base = default_params()
+    total_rows = len(data['signals']) - 1
+    used = rows = 0
+
+    def evaluate(x, metrics, win):
+        nonlocal used, rows
+        r, n = _window_backtest(data, base.replace(**dict(zip(names, (float(v) for v in x)))), win)
+        used += 1
+        rows += n
+        metrics[win] = r
+
+    # Successive halving on increasingly long windows
+    per_rung = sum(eta ** -i for i in range(len(rungs)))
+    n0 = max(eta ** (len(rungs) - 1), int(budget * 0.5 / per_rung))
+    pool = [(lo + rng.random(len(names)) * (hi - lo), {}) for _ in range(n0)]
+    for i, win in enumerate(rungs):
+        for x, metrics in pool:
+            if used >= budget:
+                break
+            evaluate(x, metrics, win)
+        pool = [c for c in pool if win in c[1]]
+        if not pool:
+            break
+        pool.sort(key=lambda c: _partial_score(c[1]), reverse=True)
+        if verbose:
+            print(f"  rung {i} ({window_label(*win)}yr): {len(pool)} configs, "
+                  f"best partial score {_partial_score(pool[0][1]):.4f}, {used} backtests")
+        if i < len(rungs) - 1:
+            pool = pool[:max(1, len(pool) // eta)]
+
+    full = [c for c in pool if len(c[1]) == len(rungs)]
+    if not full:
+        return None
+    best_x, best_m = max(full, key=lambda c: _partial_score(c[1]))
+    best_score = _partial_score(best_m)
+
+    # Local refinement around the incumbent at full fidelity
+    step = 0.15
+    while used + len(rungs) <= budget:
+        x = np.clip(best_x + rng.normal(0, step, len(names)) * (hi - lo), lo, hi)
+        metrics = {}
+        for win in rungs:
+            evaluate(x, metrics, win)
+        score = _partial_score(metrics)
+        if score > best_score:
+            best_x, best_m, best_score = x, metrics, score
+        else:
+            step = max(0.01, step * 0.85)
+
+    best = dict(zip(names, (float(v) for v in best_x)))
+    passes = rows / total_rows
+    if verbose:
+        print(f"\nBest after {used} backtests ({passes:.1f} full-history passes): " +
+              ", ".join(f"{k}={v:.3f}" for k, v in best.items()) + f"  score={best_score:.4f}")
+        for w in OPT_WINDOWS:
+            sh, tr, dd = best_m[w]
+            print(f"  {window_label(*w)}yr: Sharpe={sh:.4f}, Ret={tr*100:+.1f}%, DD={dd*100:.0f}%")
+    return {'params': best, 'score': best_score, 'metrics': best_m, 'backtests': used, 'passes': passes}
+
+
+def run_search(budget=120, seed=0, compare=True):
+    """CLI wrapper: adaptive search, optionally scored against the exhaustive grid."""
+    print(f"\n{'=' * 100}")
+    print(f"ST8 ADAPTIVE SEARCH: budget {budget} backtests, seed {seed}")
+    print(f"{'=' * 100}")
+    res = adaptive_search(budget=budget, seed=seed)
+    if res is None or not compare:
+        return res
+    grid = sweep_grid(intl_risk_power=[0, 0.5, 1.0, 1.5, 2.0, 2.5, 3.0, 4.0, 5.0],
+                      ewy_share=[0.0, 0.25, 0.5, 0.75, 1.0],
+                      intl_max_share=[0.25, 0.35, 0.50])
+    df = sweep_kernel(**grid)
+    # Every grid config needs its full-history path; the search pays per window row
+    n_grid = len(df)
+    print(f"\nGrid best ({n_grid} full-history passes): score={df['score'].max():.4f}  |  "
+          f"search: score={res['score']:.4f} with {res['backtests']} window backtests = "
+          f"{res['passes']:.1f} full-history passes ({res['passes'] / n_grid:.0%} of grid)")
+    return res
+
+
+# Parameter grid re-optimized in every walk-forward fold (same as optimize_risk_power)
+WALK_FORWARD_GRID = {'intl_risk_power': [0, 0.5, 1.0, 1.5, 2.0, 2.5, 3.0, 4.0, 5.0],
+                     'ewy_share': [0.0, 0.25, 0.5, 0.75, 1.0],
+                     'intl_max_share': [0.25, 0.35, 0.50]}
+
+
+def _walk_forward_fold(fold):
+    """Optimize on the fold's train window, return the winner and its out-of-sample returns.
+
+    The training score is the optimizer's: Sharpe, halved past the dd_limit() of the window.
+    """
+    train, test, grid = fold
+    df = sweep_kernel(windows=[train], **sweep_grid(**grid))
+    lab = window_label(*train)
+    score = df[f'sh{lab}'].where(df[f'dd{lab}'] >= dd_limit(train), df[f'sh{lab}'] * 0.5)
+    best = df.loc[score.idxmax()]
+    params = {k: float(best[k]) for k in grid}
+
+    data = _get_data()
+    prev_idx, _, _, ret, _ = _vector_returns(data, default_params().replace(**params))
+    sel = (prev_idx.year >= test[0]) & (prev_idx.year <= test[1]) & ~np.isnan(ret)
+    oos = pd.Series(ret[sel], index=prev_idx[sel])
+    return {'train': train, 'test': test, 'params': params,
+            'is_sharpe': float(best[f'sh{lab}']), 'is_score': float(score.max()), 'oos': oos}
+
+
+def walk_forward(train_years=10, test_years=2, end_year=2024, grid=None, workers=1, verbose=True):
+    """Rolling re-optimization: fit on a trailing window, trade the next block out of sample.
+
+    Folds start once a full train window of data exists and step by test_years.
+    Each fold runs the batched kernel over the grid on its train window; folds are
+    spread over a process pool when workers > 1. Returns (folds, oos_returns, metrics)
+    where oos_returns is the stitched out-of-sample series and metrics its
+    (sharpe, total_return, max_drawdown).
+    """
+    if grid is None:
+        grid = WALK_FORWARD_GRID
+    data = _get_data()
+    if data is None:
+        if verbose: print('ERROR: Missing data')
+        return None
+
+    first_year = data['signals'].index[0].year
+    folds = []
+    for ts in range(first_year + train_years, end_year + 1, test_years):
+        folds.append(((ts - train_years, ts - 1), (ts, min(ts + test_years - 1, end_year)), grid))
+    if not folds:
+        if verbose: print('ERROR: Not enough history for one fold')
+        return None
+
+    results = list(_pool_map(_walk_forward_fold, folds, workers))
+    oos = pd.concat([r['oos'] for r in results])
+    stats = _window_stats(oos.to_numpy()[None, :], oos.index.year.to_numpy(),
+                          [(folds[0][1][0], end_year)])
+    sh, tr, dd = (float(v[0]) for v in next(iter(stats.values())))
+
+    if verbose:
+        names = list(grid)
+        print(f"\n{'=' * 100}")
+        print(f"ST8 WALK-FORWARD: {train_years}yr train → {test_years}yr test, {len(folds)} folds")
+        print(f"{'=' * 100}")
+        print(f"{'Train':>11s} {'Test':>11s} " + ' '.join(f'{PARAM_LABELS.get(n, n):>7s}' for n in names) +
+              f" {'IS_Sh':>7s} {'OOS_Sh':>7s} {'OOS_Ret':>8s} {'OOS_DD':>7s}")
+        print('-' * 100)
+        for r in results:
+            o = r['oos'].to_numpy()
+            f_sh = o.mean() / o.std() * np.sqrt(12) if len(o) > 1 and o.std() > 0 else np.nan
+            cum = np.cumprod(1 + o)
+            f_dd = (cum / np.maximum.accumulate(cum) - 1).min() if len(o) else np.nan
+            f_tr = cum[-1] - 1 if len(o) else np.nan
+            print(f"{r['train'][0]}-{r['train'][1]} {r['test'][0]}-{r['test'][1]} " +
+                  ' '.join(f"{r['params'][n]:7.2f}" for n in names) +
+                  f" {r['is_sharpe']:7.4f} {f_sh:7.4f} {f_tr*100:+7.1f}% {f_dd*100:6.0f}%")
+
+        static = backtest_windows([(folds[0][1][0], end_year)], verbose=False)
+        print(f"\nCombined OOS {folds[0][1][0]}-{end_year}: Sharpe={sh:.4f}, Ret={tr*100:+.1f}%, DD={dd*100:.0f}%")
+        if static and static.get((folds[0][1][0], end_year)):
+            s_sh, s_tr, s_dd = static[(folds[0][1][0], end_year)]
+            print(f"Static params, same span:   Sharpe={s_sh:.4f}, Ret={s_tr*100:+.1f}%, DD={s_dd*100:.0f}%")
+
+    return results, oos, (sh, tr, dd)
+
+
+# ── Monte Carlo ───────────────────────────────────────────
+
+def _path_metrics(rets):
+    """(sharpe, cagr, max_drawdown) arrays for each row of a (paths, months) return matrix."""
+    sd = rets.std(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        sh = np.where(sd > 0, rets.mean(axis=1) / sd * np.sqrt(12), np.nan)
+    cum = np.cumprod(1 + rets, axis=1)
+    cagr = cum[:, -1] ** (12 / rets.shape[1]) - 1
+    dd = (cum / np.maximum.accumulate(cum, axis=1) - 1).min(axis=1)
+    return sh, cagr, dd
+
+
+def block_bootstrap_indices(n_rows, n_paths, length, block=12, rng=None):
+    """Circular block-bootstrap row indices, shape (n_paths, length)."""
+    if rng is None:
+        rng = np.random.default_rng()
+    n_blocks = -(-length // block)
+    starts = rng.integers(0, n_rows, size=(n_paths, n_blocks))
+    idx = (starts[:, :, None] + np.arange(block)[None, None, :]) % n_rows
+    return idx.reshape(n_paths, -1)[:, :length]
+
+
+def monte_carlo(n_paths=10000, block=12, seed=0, start_year=1965, end_year=2024,
+                months=None, chunk_size=1000, ath_params=None, gate=None, sma_params=None,
+                intl_risk_power=None, ewy_share=None, intl_max_share=None, params=None):
+    """Block-bootstrap Monte Carlo of the strategy and SPY.
+
+    Each sampled row is one monthly transition: the macro, ATH and SMA inputs
+    seen at rebalance together with the following month's asset returns, so
+    blocks keep both the signal→return link and short-range autocorrelation.
+    Weights (months × assets) are computed once from those inputs; every
+    chunk of paths is then evaluated as a (paths × months × assets) tensor.
+    Returns {'st8': (sharpe, cagr, dd), 'SPY': (...)} of (n_paths,) arrays plus
+    'historical' metrics of the unshuffled window.
+    """
+    p = _resolve_params(params, ath_params, gate, sma_params,
+                        intl_risk_power, ewy_share, intl_max_share)
+
+    data = _get_data()
+    if data is None:
+        print('ERROR: Missing data')
+        return None
+
+    prev_idx, _, w, ret, _ = _vector_returns(data, p)
+    r = data['m'].iloc[1:][[f'{a}_r' for a in ALL_ASSETS]].to_numpy(dtype=float)
+    sel = (prev_idx.year >= start_year) & (prev_idx.year <= end_year) & ~np.isnan(ret)
+    w, r = w[sel], np.nan_to_num(r[sel])
+    spy = r[:, ALL_ASSETS.index('SPY')]
+    n_rows = len(w)
+    length = months or n_rows
+
+    rng = np.random.default_rng(seed)
+    out = {'st8': [np.empty(n_paths) for _ in range(3)],
+           'SPY': [np.empty(n_paths) for _ in range(3)]}
+    for lo in range(0, n_paths, chunk_size):
+        hi = min(lo + chunk_size, n_paths)
+        idx = block_bootstrap_indices(n_rows, hi - lo, length, block, rng)
+        path_rets = np.einsum('pma,pma->pm', w[idx], r[idx])
+        for name, pr in (('st8', path_rets), ('SPY', spy[idx])):
+            for k, v in enumerate(_path_metrics(pr)):
+                out[name][k][lo:hi] = v
+
+    result = {name: tuple(v) for name, v in out.items()}
+    result['historical'] = {name: tuple(float(x[0]) for x in _path_metrics(h[None, :]))
+                            for name, h in (('st8', ret[sel]), ('SPY', spy))}
+    result['rows'] = n_rows
+    return result
+
+
+def run_monte_carlo(n_paths=10000, block=12, seed=0, start_year=1965, end_year=2024):
+    """CLI wrapper: print percentile tables for the bootstrap distributions."""
+    t0 = time.time()
+    res = monte_carlo(n_paths=n_paths, block=block, seed=seed, start_year=start_year, end_year=end_year)
+    if res is None:
+        return None
+    print(f"\n{'=' * 90}")
+    print(f"ST8 BLOCK-BOOTSTRAP MONTE CARLO: {n_paths:,} paths × {res['rows']} months, "
+          f"block={block}, seed={seed} ({time.time() - t0:.1f}s)")
+    print(f"{'=' * 90}")
+    pcts = [5, 25, 50, 75, 95]
+    for name in ('st8', 'SPY'):
+        sh, cagr, dd = res[name]
+        h_sh, h_cagr, h_dd = res['historical'][name]
+        print(f"\n{name}")
+        print(f"{'':8s} {'Hist':>8s} " + ' '.join(f'{f"P{p}":>8s}' for p in pcts) + f" {'Mean':>8s}")
+        print(f"{'Sharpe':8s} {h_sh:8.3f} " + ' '.join(f'{v:8.3f}' for v in np.nanpercentile(sh, pcts)) + f" {np.nanmean(sh):8.3f}")
+        print(f"{'CAGR':8s} {h_cagr*100:7.1f}% " + ' '.join(f'{v*100:7.1f}%' for v in np.percentile(cagr, pcts)) + f" {cagr.mean()*100:7.1f}%")
+        print(f"{'MaxDD':8s} {h_dd*100:7.1f}% " + ' '.join(f'{v*100:7.1f}%' for v in np.percentile(dd, pcts)) + f" {dd.mean()*100:7.1f}%")
+    sh_st8, sh_spy = res['st8'][0], res['SPY'][0]
+    limit = dd_limit((start_year, end_year))
+    print(f"\nP(st8 Sharpe > SPY Sharpe) = {np.mean(sh_st8 > sh_spy):.1%}   "
+          f"P(st8 MaxDD worse than {limit:.0%}) = {np.mean(res['st8'][2] < limit):.1%}")
+    return res
+
+
+# ── Daily simulation ──────────────────────────────────────
+
+def daily_budget():
+    """Live per-day trading cap, budget.max_daily_exchange as daily_operation reads it from config.json."""
+    import daily_operation  # imports this module, so not at the top
+    return float(daily_operation.AppConfig.load().budget.max_daily_exchange)
+
+
+def _daily_targets(data, p, days):
+    """(days × assets) live targets: the monthly st8 weights of the last completed
+    month times the SMA filter on that day's close, renormalized over assets
+    with a price, as compute_todays_target() does each trading day."""
+    inp = _vector_inputs(data, p)
+    w0 = compute_weights_array(inp['rs'], inp['m'], inp['cape'], inp['ath_factors'], params=p)
+    # signals row j is month-end j; days in month j + 1 trade on it
+    month = np.searchsorted(data['m'].index.to_numpy(), days.to_numpy(), side='left') - 1
+    px, sma = np.empty((len(days), len(ALL_ASSETS))), np.empty((len(days), len(ALL_ASSETS)))
+    for j, a in enumerate(ALL_ASSETS):
+        ser = _unique_index(data['prices'][a]).dropna()
+        px[:, j] = ser.reindex(days, method='ffill').to_numpy()
+        sma[:, j] = ser.rolling(p.sma_period).mean().reindex(days, method='ffill').to_numpy()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        sma_f = np.where(sma > 0, sigmoid(px / sma, 1.0, p.sma_k), 1.0)
+    t = np.where(np.isnan(px), 0.0, w0[month] * np.where(np.isnan(sma_f), 1.0, sma_f))
+    tw = t.sum(axis=1, keepdims=True)
+    return np.divide(t, tw, out=np.zeros_like(t), where=tw > 0), px
+
+
+def daily_simulation(start='2004-01-01', end=None, budget=None, initial_cash=100000.0,
+                     invested=False, params=None):
+    """Replay live st8 targets day by day through the diff-trade budget logic.
+
+    Each trading day mirrors daily_operation.compute_diff_trades +
+    execute_diff_trades: positive weight gaps are scaled to spend the budget,
+    each trade is capped at budget × |gap|, trades of $0.01 or less are
+    dropped, and shares/cash are plain (assets,) arrays; verify_engines()
+    checks the replay against those functions. budget None trades
+    straight to target every day; invested starts at target instead of in
+    cash. Targets come from the precomputed monthly signals plus the daily
+    SMA filter (_daily_targets). Returns a dict of daily Series/arrays:
+    value, cash, turnover, gap (half the L1 distance to target), weights.
+    """
+    data = _get_data()
+    if data is None:
+        print('ERROR: Missing data')
+        return None
+    p = params if params is not None else default_params()
+    days = _unique_index(data['prices']['SPY']).loc[start:end].index
+    target, px = _daily_targets(data, p, days)
+    px = np.nan_to_num(pd.DataFrame(px).ffill().to_numpy())
+    live = px > 0
+
+    n, k = target.shape
+    shares, cash = np.zeros(k), float(initial_cash)
+    if invested:
+        shares = np.divide(target[0] * cash, px[0], out=np.zeros(k), where=live[0])
+        cash = 0.0
+    value = np.empty(n)
+    cash_hist = np.empty(n)
+    turnover = np.zeros(n)
+    weights = np.empty((n, k))
+    for i in range(n):
+        held = shares * px[i]
+        total = held.sum() + cash
+        diff = target[i] - (held / total if total > 0 else 0.0)
+        pos = diff[diff > 0].sum()
+        if pos > 1e-9:
+            b = total if budget is None else budget
+            tv = np.clip(diff * (b / pos), -b * np.abs(diff), b * np.abs(diff))
+            tv = np.where((np.abs(tv) > 0.01) & live[i], tv, 0.0)
+            shares = shares + np.divide(tv, px[i], out=np.zeros(k), where=live[i])
+            cash -= tv.sum()
+            turnover[i] = np.abs(tv).sum()
+            held = shares * px[i]
+        value[i] = held.sum() + cash
+        cash_hist[i] = cash
+        weights[i] = held / value[i] if value[i] > 0 else 0.0
+    gap = np.abs(target - weights).sum(axis=1) / 2
+
+    return {'value': pd.Series(value, index=days), 'cash': pd.Series(cash_hist, index=days),
+            'turnover': pd.Series(turnover, index=days), 'gap': pd.Series(gap, index=days),
+            'weights': pd.DataFrame(weights, index=days, columns=ALL_ASSETS), 'target': target}
+
+
+def _daily_sim_metrics(value):
+    """(CAGR, Sharpe from month-end values, max drawdown from daily values)."""
+    monthly = value.resample('ME').last().pct_change().dropna().to_numpy()
+    years = (value.index[-1] - value.index[0]).days / 365.25
+    cagr = (value.iloc[-1] / value.iloc[0]) ** (1 / years) - 1
+    sh = monthly.mean() / monthly.std() * np.sqrt(12) if monthly.std() > 0 else np.nan
+    dd = (value / value.cummax() - 1).min()
+    return cagr, sh, dd
+
+
+def run_daily_simulation(start='2004-01-01', budget=None, initial_cash=100000.0):
+    """Compare the monthly backtest with daily replays, uncapped and under the live cap."""
+    if budget is None:
+        budget = daily_budget()
+    rows = []
+    timings = []
+    for label, b, inv in ((f'daily, ${budget:,.0f}/day cap, from cash', budget, False),
+                          (f'daily, ${budget:,.0f}/day cap, invested', budget, True),
+                          ('daily, uncapped', None, True)):
+        t0 = time.time()
+        sim = daily_simulation(start=start, budget=b, initial_cash=initial_cash, invested=inv)
+        if sim is None:
+            return None
+        timings.append(time.time() - t0)
+        cash_pct = (sim['cash'] / sim['value']).mean()
+        rows.append((label, *_daily_sim_metrics(sim['value']), sim['gap'].mean(), cash_pct,
+                     sim['turnover'].sum() / initial_cash))
+
+    data = _get_data()
+    prev_idx, cur_idx, _, ret, _ = _vector_returns(data, default_params())
+    sel = (prev_idx >= pd.Timestamp(start) - pd.offsets.MonthEnd(1)) & ~np.isnan(ret)
+    r = ret[sel]
+    cum = np.cumprod(1 + r)
+    years = len(r) / 12
+    rows.insert(0, ('monthly backtest (idealized)', cum[-1] ** (1 / years) - 1,
+                    r.mean() / r.std() * np.sqrt(12), (cum / np.maximum.accumulate(cum) - 1).min(),
+                    np.nan, 0.0, np.nan))
+
+    days = len(sim['value'])
+    print(f"\n{'=' * 100}")
+    print(f"ST8 DAILY SIMULATION: {days:,} trading days from {sim['value'].index[0].date()}, "
+          f"${initial_cash:,.0f} start, {np.mean(timings):.2f}s per run")
+    print(f"{'=' * 100}")
+    print(f"{'Run':38s} {'CAGR':>7s} {'Sharpe':>7s} {'MaxDD':>7s} {'AvgGap':>7s} {'Cash':>6s} {'Traded':>7s}")
+    print('-' * 84)
+    for label, cagr, sh, dd, g, c, traded in rows:
+        print(f"{label:38s} {cagr*100:6.2f}% {sh:7.3f} {dd*100:6.1f}% "
+              + (f"{g*100:6.1f}%" if np.isfinite(g) else f"{'—':>7s}")
+              + f" {c*100:5.1f}% " + (f"{traded:6.1f}x" if np.isfinite(traded) else f"{'—':>7s}"))
+    cap_cost = rows[2][1] - rows[3][1]
+    print(f"\nCost of the ${budget:,.0f}/day cap vs uncapped daily (invested start): {cap_cost*100:+.2f}% CAGR")
+    print("AvgGap = mean half-L1 distance from the daily target; Traded = total turnover / starting cash")
+    return rows
+
+
+# ── Rebalance calendars ───────────────────────────────────
+
+# Calendar rebalances happen on the first trading day of each period, the day
+# a new month's signals first apply; 'drift:X' rebalances whenever the half-L1
+# distance from the daily target exceeds X.
+REBALANCE_CALENDARS = ('daily', 'weekly', 'biweekly', 'monthly', 'quarterly', 'drift:0.05', 'drift:0.10')
+_CALENDAR_PERIODS = {'weekly': 'W', 'biweekly': 'W', 'monthly': 'M', 'quarterly': 'Q'}
+
+
+def rebalance_calendar(days, calendar):
+    """(days,) bool mask of rebalance days for a named calendar (None for drift calendars)."""
+    if calendar.startswith('drift:'):
+        return None
+    if calendar == 'daily':
+        return np.ones(len(days), dtype=bool)
+    if calendar not in _CALENDAR_PERIODS:
+        raise ValueError(f'unknown rebalance calendar: {calendar!r}')
+    period = days.to_period(_CALENDAR_PERIODS[calendar]).asi8
+    first = np.concatenate([[True], period[1:] != period[:-1]])
+    if calendar == 'biweekly':
+        keep = np.zeros(len(days), dtype=bool)
+        keep[np.flatnonzero(first)[::2]] = True
+        first = keep
+    return first
+
+
+def calendar_backtest(calendars=REBALANCE_CALENDARS, start='2004-01-01', end=None, params=None):
+    """Frictionless daily backtest of st8 under several rebalance calendars at once.
+
+    All calendars share one (days × assets) return array and the live daily
+    targets of _daily_targets(); each starts at target and, between
+    rebalances, lets its weights drift with returns. On a rebalance day the
+    portfolio is reset to that day's target at the close. The day loop runs
+    once with every calendar as a row of a (calendars × assets) state.
+    Returns a dict of DataFrames (days × calendars): value (growth of 1),
+    turnover (one-way, fraction of the portfolio traded each day) and gap
+    (half-L1 distance from target after trading), plus rebalances, a Series
+    of rebalance counts.
+    """
+    data = _get_data()
+    if data is None:
+        print('ERROR: Missing data')
+        return None
+    p = params if params is not None else default_params()
+    days = _unique_index(data['prices']['SPY']).loc[start:end].index
+    target, px = _daily_targets(data, p, days)
+    px = pd.DataFrame(px).ffill().to_numpy()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        r = np.nan_to_num(px[1:] / px[:-1] - 1)
+
+    k = len(calendars)
+    fixed = np.zeros((k, len(days)), dtype=bool)
+    thresh = np.full(k, np.inf)
+    for j, cal in enumerate(calendars):
+        mask = rebalance_calendar(days, cal)
+        if mask is None:
+            thresh[j] = float(cal.split(':', 1)[1])
+        else:
+            fixed[j] = mask
+
+    n = len(days)
+    value, turnover, gap = np.ones((k, n)), np.zeros((k, n)), np.zeros((k, n))
+    count = np.zeros(k, dtype=int)
+    w = np.repeat(target[:1], k, axis=0)
+    for i in range(1, n):
+        w = w * (1 + r[i - 1])
+        g = w.sum(axis=1)
+        value[:, i] = value[:, i - 1] * g
+        w = w / g[:, None]
+        dist = np.abs(target[i] - w).sum(axis=1) / 2
+        reb = fixed[:, i] | (dist > thresh)
+        turnover[:, i] = np.where(reb, dist, 0.0)
+        gap[:, i] = np.where(reb, 0.0, dist)
+        count += reb
+        w = np.where(reb[:, None], target[i], w)
+
+    cols = list(calendars)
+    return {'value': pd.DataFrame(value.T, index=days, columns=cols),
+            'turnover': pd.DataFrame(turnover.T, index=days, columns=cols),
+            'gap': pd.DataFrame(gap.T, index=days, columns=cols),
+            'rebalances': pd.Series(count, index=cols)}
+
+
+def run_rebalance_sweep(calendars=REBALANCE_CALENDARS, start='2004-01-01'):
+    """Turnover versus return and risk for every rebalance calendar."""
+    t0 = time.time()
+    res = calendar_backtest(calendars, start=start)
+    if res is None:
+        return None
+    elapsed = time.time() - t0
+    value = res['value']
+    years = (value.index[-1] - value.index[0]).days / 365.25
+    print(f"\n{'=' * 84}")
+    print(f"ST8 REBALANCE CALENDARS: {len(calendars)} calendars × {len(value):,} trading days "
+          f"from {value.index[0].date()} in {elapsed:.2f}s")
+    print(f"{'=' * 84}")
+    print(f"{'Calendar':>12s} {'Rebal/yr':>9s} {'Turn/yr':>8s} {'AvgGap':>7s} {'CAGR':>7s} {'Sharpe':>7s} {'MaxDD':>7s}")
+    print('-' * 64)
+    rows = []
+    for cal in calendars:
+        cagr, sh, dd = _daily_sim_metrics(value[cal])
+        row = (cal, res['rebalances'][cal] / years, res['turnover'][cal].sum() / years,
+               res['gap'][cal].mean(), cagr, sh, dd)
+        rows.append(row)
+        print(f"{cal:>12s} {row[1]:9.1f} {row[2]:7.2f}x {row[3]*100:6.2f}% {cagr*100:6.2f}% {sh:7.3f} {dd*100:6.1f}%")
+    print("\nTurn/yr = one-way turnover per year (× portfolio); AvgGap = mean half-L1 drift from target")
+    return rows
+
+
 # ── Command-line interface ────────────────────────────────
 
-def show_results(start, label):
-    r = backtest(start, 2024)
+def _cli_options(argv, **types):
+    """'--flag value' options from argv converted by types, e.g. prune_cap=float reads --prune-cap.
+
+    A flag typed bool takes no value and is True when present. Flags not in
+    types are ignored; the result only holds the options given.
+    """
+    opts = {}
+    for i, arg in enumerate(argv):
+        name = arg[2:].replace('-', '_') if arg.startswith('--') else None
+        if name not in types:
+            continue
+        if types[name] is bool:
+            opts[name] = True
+        elif i + 1 < len(argv):
+            opts[name] = types[name](argv[i + 1])
+    return opts
+
+
+def show_results(start, label, r=None):
+    if r is None:
+        r = backtest_vectorized(start, 2024)
     if r is None:
         return
     sh, tr, dd = r
@@ -409,6 +2935,11 @@ def show_results(start, label):
     print(f"Sharpe: {sh:.4f}")
     print(f"Return:{tr * 100:+8.1f}%")
     print(f"MaxDD:{dd * 100:.0f}%")
+    net = backtest_net(start, 2024)
+    if net is not None:
+        print(f"Turnover: {net['turnover'] * 100:.0f}%/yr one-way, costs {net['cost'] * 1e4:.1f} bp/yr "
+              f"(COST_BPS) -> net Sharpe {net['nsh']:.4f}, Return {net['ntr'] * 100:+.1f}%, "
+              f"MaxDD {net['ndd'] * 100:.0f}%")
 
     spy_p = load_price('SPY')
     if spy_p is not None:
@@ -425,20 +2956,64 @@ def show_results(start, label):
 
 if __name__ == '__main__':
     if len(sys.argv) < 2:
-        print('Usage: python3 strategy_all_8.py [history|current|critique|optimize]')
+        print('Usage: python3 strategy_all_8.py [history|current|critique|optimize|sweep|smasweep|athsweep|allocsweep|sensitivity|lagsweep|ablation|pareto|results|search|walkforward|montecarlo|daily|rebalance|verify|cache]')
         sys.exit(1)
 
     cmd = sys.argv[1]
     if cmd == 'history':
-        show_results(2000, '25yr')
-        show_results(1965, '60yr')
-        show_results(2011, '14yr')
+        res = backtest_windows(((2000, 2024), (1965, 2024), (2011, 2024))) or {}
+        show_results(2000, '25yr', res.get((2000, 2024)))
+        show_results(1965, '60yr', res.get((1965, 2024)))
+        show_results(2011, '14yr', res.get((2011, 2024)))
+        show_rolling()
     elif cmd == 'current':
         print("Current allocation not yet implemented")
     elif cmd == 'critique':
         print("Critique not yet implemented")
     elif cmd == 'optimize':
-        optimize_risk_power()
+        opts = _cli_options(sys.argv[2:], workers=int, checkpoint=str, prune_cap=float,
+                            prune=bool, hard_dd=bool)
+        optimize_risk_power(workers=opts.get('workers', 1), checkpoint=opts.get('checkpoint'),
+                            prune=any(k in opts for k in ('prune', 'hard_dd', 'prune_cap')),
+                            hard_dd=opts.get('hard_dd', False),
+                            prune_cap=opts.get('prune_cap', PRUNE_SHARPE_CAP))
+    elif cmd == 'sweep':
+        run_sweep(**_cli_options(sys.argv[2:], checkpoint=str))
+    elif cmd == 'smasweep':
+        run_sma_sweep()
+    elif cmd == 'athsweep':
+        run_ath_sweep()
+    elif cmd == 'allocsweep':
+        opts = _cli_options(sys.argv[2:], configs=int, seed=int, checkpoint=str)
+        run_alloc_sweep(n=opts.get('configs', 20000), seed=opts.get('seed', 0), checkpoint=opts.get('checkpoint'))
+    elif cmd == 'sensitivity':
+        run_indicator_sensitivity()
+    elif cmd == 'lagsweep':
+        run_lag_sweep()
+    elif cmd == 'ablation':
+        run_ablation()
+    elif cmd == 'pareto':
+        run_pareto(**_cli_options(sys.argv[2:], checkpoint=str))
+    elif cmd == 'results':
+        results_command(sys.argv[2:])
+    elif cmd == 'search':
+        run_search(**_cli_options(sys.argv[2:], budget=int, seed=int))
+    elif cmd == 'walkforward':
+        opts = _cli_options(sys.argv[2:], train=int, test=int, workers=int)
+        walk_forward(train_years=opts.get('train', 10), test_years=opts.get('test', 2), workers=opts.get('workers', 1))
+    elif cmd == 'montecarlo':
+        opts = _cli_options(sys.argv[2:], paths=int, block=int, seed=int)
+        run_monte_carlo(n_paths=opts.get('paths', 10000), block=opts.get('block', 12), seed=opts.get('seed', 0))
+    elif cmd == 'daily':
+        opts = _cli_options(sys.argv[2:], budget=float, cash=float, start=str)
+        run_daily_simulation(start=opts.get('start', '2004-01-01'), budget=opts.get('budget'),
+                             initial_cash=opts.get('cash', 100000.0))
+    elif cmd == 'rebalance':
+        run_rebalance_sweep(**_cli_options(sys.argv[2:], start=str))
+    elif cmd == 'verify':
+        verify_engines()
+    elif cmd == 'cache':
+        cache_command(sys.argv[2] if len(sys.argv) > 2 else 'info')
 
     elif cmd == 'quick_test':
         # Quick comparative test